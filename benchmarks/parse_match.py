@@ -0,0 +1,78 @@
+"""Benchmark `parse_match` time and memory, and model object construction.
+
+Usage: python -m benchmarks.parse_match <rec> [<rec> ...]
+"""
+import gc
+import sys
+import time
+import timeit
+import tracemalloc
+from datetime import timedelta
+
+from mgz.fast import Action as ActionEnum
+from mgz.model import parse_match
+from mgz.model.definitions import Action, Position
+
+
+def parse(path, repeat=3):
+    """Best parse time, and memory retained by and peak during a parse."""
+    best = None
+    for _ in range(repeat):
+        with open(path, 'rb') as handle:
+            start = time.perf_counter()
+            parse_match(handle)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    gc.collect()
+    tracemalloc.start()
+    with open(path, 'rb') as handle:
+        match = parse_match(handle)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    objects = len(match.actions) + len(match.inputs) + len(match.file.viewlocks)
+    return best, retained, peak, objects
+
+
+def filtered(path, action_types=(ActionEnum.RESIGN, ActionEnum.RESEARCH), repeat=5):
+    """Best parse time without and with an action type filter."""
+    best = {}
+    for kwargs in (dict(), dict(action_types=set(action_types))):
+        times = []
+        for _ in range(repeat):
+            with open(path, 'rb') as handle:
+                start = time.perf_counter()
+                parse_match(handle, **kwargs)
+                times.append(time.perf_counter() - start)
+        best[bool(kwargs)] = min(times)
+    return best[False], best[True]
+
+
+def construct(number=100000):
+    """Time to construct model objects, and their size."""
+    timestamp = timedelta(0)
+
+    def create():
+        return Action(timestamp, ActionEnum.MOVE, {}, None, Position(1.0, 2.0))
+
+    tracemalloc.start()
+    objects = [create() for _ in range(number)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return timeit.timeit(create, number=number), size
+
+
+def main():
+    """Entry point."""
+    elapsed, size = construct()
+    print(f'construct 100000 actions: {elapsed:.3f}s, {size / 1e6:.1f} MB')
+    for path in sys.argv[1:]:
+        best, retained, peak, objects = parse(path)
+        print(f'{path}: {best:.3f}s, retained {retained / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB ({objects} actions, inputs and viewlocks)')
+        unfiltered, resign_research = filtered(path)
+        print(f'{path}: {unfiltered:.3f}s unfiltered, {resign_research:.3f}s with action_types={{RESIGN, RESEARCH}}')
+
+
+if __name__ == '__main__':
+    main()
@@ -48,3 +48,5 @@ header = Struct(
     "log_version"/If(lambda ctx: ctx.save_version >= 11.76, Peek(Int32ul)),
     "version"/Computed(lambda ctx: get_version(ctx.game_version, ctx.save_version, ctx.log_version))
 )
+
+from mgz.batch import parse_many, summarize_many
@@ -0,0 +1,152 @@
+"""Parse many recorded games across a process pool.
+
+Files are fanned out to worker processes and results are streamed
+back as they complete. A file that fails, times out or crashes its
+worker is reported in its result rather than aborting the batch.
+"""
+import collections
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+
+from mgz import reference
+
+
+@dataclass
+class BatchResult:
+    """Outcome of processing one file."""
+
+    path: str
+    value: object = None
+    error: str = None
+    duration: float = None
+    timed_out: bool = False
+
+    @property
+    def ok(self):
+        """Whether the file was processed."""
+        return self.error is None
+
+
+class _Timeout(Exception):
+    """Raised in a worker when a file runs past its timeout."""
+
+
+def _alarm(signum, frame):
+    """Interrupt a file that runs past its timeout."""
+    raise _Timeout()
+
+
+def _process(target, func, path, timeout, kwargs):
+    """Process one file in a worker."""
+    result = BatchResult(path)
+    start = time.perf_counter()
+    if timeout and hasattr(signal, 'setitimer'):
+        signal.signal(signal.SIGALRM, _alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        try:
+            with open(path, 'rb') as handle:
+                result.value = target(handle, **kwargs)
+                if func:
+                    result.value = func(result.value)
+        finally:
+            if timeout and hasattr(signal, 'setitimer'):
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    except _Timeout:
+        result.error = f"timed out after {timeout}s"
+        result.timed_out = True
+    except Exception as e: # pylint: disable=broad-except
+        result.error = f"{type(e).__name__}: {e}"
+    result.duration = time.perf_counter() - start
+    return result
+
+
+def run(target, func, paths, workers=None, timeout=None, ordered=False, **kwargs):
+    """Apply `func(target(handle, **kwargs))` to each path in a process pool.
+
+    `target` and `func` (optional) must be picklable (module-level
+    functions) and so must the values they return. Yields a
+    `BatchResult` per path, in completion order, or in input order if
+    `ordered` is set. Timeouts (seconds) are enforced in workers where
+    `signal.setitimer` is available. If a worker crashes, the files
+    that were in flight are retried one at a time, so only the file
+    that crashed is reported as failed.
+
+    Reference data is loaded before workers start, so forked workers
+    share it.
+    """
+    reference.load()
+    workers = workers or os.cpu_count() or 1
+    paths = enumerate(paths)
+    pending = {}
+    finished = {}
+    retry = collections.deque()
+    next_index = 0
+    executor = ProcessPoolExecutor(workers)
+    try:
+        while True:
+            # Bound the number of files in flight, so a crash only affects those.
+            # Files in flight during a crash are retried one at a time, to find
+            # the one that crashed.
+            while len(pending) < (1 if retry else workers * 2):
+                index, path = retry.popleft() if retry else next(paths, (None, None))
+                if path is None:
+                    break
+                pending[executor.submit(_process, target, func, path, timeout, kwargs)] = index, path
+            if not pending:
+                return
+            in_flight = len(pending)
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            broken = any(isinstance(f.exception(), BrokenProcessPool) for f in done)
+            for future in done:
+                index, path = pending.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool as e:
+                    if in_flight > 1:
+                        retry.append((index, path))
+                        continue
+                    result = BatchResult(path, error=f"{type(e).__name__}: {e}")
+                except Exception as e: # pylint: disable=broad-except
+                    result = BatchResult(path, error=f"{type(e).__name__}: {e}")
+                if ordered:
+                    finished[index] = result
+                else:
+                    yield result
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
+            if broken:
+                retry.extend(pending.values())
+                pending.clear()
+                executor.shutdown(wait=False)
+                executor = ProcessPoolExecutor(workers)
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def parse_many(paths, workers=None, timeout=None, func=None, ordered=False, **kwargs):
+    """Parse matches with `parse_match` across a process pool.
+
+    Each match is converted by `func` in the worker, `serialize` by
+    default, since `Match` objects can not be sent between processes.
+    Keyword arguments are passed to `parse_match`.
+    """
+    from mgz.model import parse_match, serialize
+    return run(parse_match, func or serialize, paths, workers, timeout, ordered, **kwargs)
+
+
+def summarize_many(paths, func, workers=None, timeout=None, ordered=False, **kwargs):
+    """Summarize recorded games with `Summary` across a process pool.
+
+    `func` extracts picklable values from each summary in the worker.
+    Keyword arguments are passed to `Summary`.
+    """
+    from mgz.summary import Summary
+    return run(Summary, func, paths, workers, timeout, ordered, **kwargs)
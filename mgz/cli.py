@@ -7,16 +7,17 @@ import os
 import struct
 import sys
 from datetime import datetime
-from collections import defaultdict
+from collections import Counter
 
 from construct.core import ConstructError
 from tabulate import tabulate
 
 import mgz
+import mgz.batch
 import mgz.const
 import mgz.header
 import mgz.util
-from mgz import fast
+from mgz.fast import body
 from mgz.summary import Summary
 from mgz.util import find_postgame, LOOKAHEAD
 
@@ -31,44 +32,61 @@ CMD_HISTOGRAM = 'histogram'
 CMD_PAD = 'pad'
 
 
+def get_info(summary):
+    """Get basic info."""
+    dataset = summary.get_dataset()
+    return [
+        ['Duration', mgz.util.convert_to_timestamp(summary.get_duration() / 1000)],
+        ['Played', datetime.utcfromtimestamp(summary.get_played()) if summary.get_played() else None],
+        ['Completed', summary.get_completed()],
+        ['Restored', summary.get_restored()[0]],
+        ['Postgame', bool(summary.get_postgame())],
+        ['Version', '{} ({}, {}, {}, {})'.format(*summary.get_version())],
+        ['Dataset', '{} {}'.format(dataset['name'], dataset['version'])],
+        ['File Hash', summary.get_file_hash()],
+        ['Match Hash', summary.get_hash().hexdigest() if summary.get_hash() else None],
+        ['Encoding', summary.get_encoding()],
+        ['Language', summary.get_language()],
+        ['Device', summary.get_device()],
+        ['Map', '{} ({}, {})'.format(summary.get_map()['name'], summary.get_map()['seed'], summary.get_map()['mod_id'])] # pylint: disable=unsubscriptable-object
+    ]
+
+
+def show_info(path, info):
+    """Print basic info."""
+    print('-------------')
+    print(tabulate([['Path', path]] + info, tablefmt='plain'))
+
+
 def print_info(path):
     """Print basic info."""
     with open(path, 'rb') as handle:
-        summary = Summary(handle)
-        dataset = summary.get_dataset()
-        print('-------------')
-        print(tabulate([
-            ['Path', path],
-            ['Duration', mgz.util.convert_to_timestamp(summary.get_duration() / 1000)],
-            ['Played', datetime.utcfromtimestamp(summary.get_played()) if summary.get_played() else None],
-            ['Completed', summary.get_completed()],
-            ['Restored', summary.get_restored()[0]],
-            ['Postgame', bool(summary.get_postgame())],
-            ['Version', '{} ({}, {}, {}, {})'.format(*summary.get_version())],
-            ['Dataset', '{} {}'.format(dataset['name'], dataset['version'])],
-            ['File Hash', summary.get_file_hash()],
-            ['Match Hash', summary.get_hash().hexdigest() if summary.get_hash() else None],
-            ['Encoding', summary.get_encoding()],
-            ['Language', summary.get_language()],
-            ['Device', summary.get_device()],
-            ['Map', '{} ({}, {})'.format(summary.get_map()['name'], summary.get_map()['seed'], summary.get_map()['mod_id'])] # pylint: disable=unsubscriptable-object
-        ], tablefmt='plain'))
+        show_info(path, get_info(Summary(handle)))
+
+
+def validate(handle):
+    """Check whether a recorded game parses."""
+    size = os.fstat(handle.fileno()).st_size
+    try:
+        mgz.header.parse_stream(handle)
+        mgz.body.meta.parse_stream(handle)
+        while handle.tell() < size:
+            mgz.body.operation.parse_stream(handle)
+        return True
+    except ConstructError:
+        return False
+
+
+def show_valid(valid):
+    """Print validation result."""
+    print('valid' if valid else 'invalid')
+    return valid
 
 
 def is_valid(path):
     """Validate a recorded game."""
     with open(path, 'rb') as handle:
-        size = os.fstat(handle.fileno()).st_size
-        try:
-            mgz.header.parse_stream(handle)
-            mgz.body.meta.parse_stream(handle)
-            while handle.tell() < size:
-                mgz.body.operation.parse_stream(handle)
-            print('valid')
-            return True
-        except ConstructError:
-            print('invalid')
-            return False
+        return show_valid(validate(handle))
 
 
 def dump_rec(path):
@@ -83,12 +101,21 @@ def dump_rec(path):
             print(operation)
 
 
+def get_chat(summary):
+    """Extract chat."""
+    return summary.get_chat()
+
+
+def show_chat(chat):
+    """Print chat."""
+    for c in chat:
+        print(c)
+
+
 def print_chat(path):
     """Extract chat."""
     with open(path, 'rb') as handle:
-        summary = Summary(handle)
-        for c in summary.get_chat():
-            print(c)
+        show_chat(get_chat(Summary(handle)))
 
 
 def merge_recs(part_one, part_two, output):
@@ -143,44 +170,77 @@ def pad_rec(target_size, path, output):
         padded.write(pad_op)
 
 
+def get_histogram(handle):
+    """Count operations and actions."""
+    mgz.header.parse_stream(handle)
+    pos = handle.tell()
+    handle.seek(0)
+    rec = handle.read()
+    index = body.index(rec, body.meta(rec, pos))
+    operations = Counter({op_type.name: count for op_type, count in index.operation_counts().items()})
+    actions = Counter(index.action_counts())
+    return operations, actions
+
+
+def show_histogram(operations, actions):
+    """Show operation and action histogram."""
+    labels = {}
+    for action_id in actions:
+        action_type = body.ACTIONS.get(action_id)
+        labels[action_id] = action_type.name if action_type else None
+    print('Operations')
+    print(tabulate([
+        [operation, operations[operation]]
+        for operation in sorted(operations, key=operations.get, reverse=True)
+    ], headers=['Name', 'Count'], tablefmt='simple'))
+    print()
+    print('Actions')
+    print(tabulate([
+        ['{0:#0{1}x}'.format(action, 4), labels[action], actions[action]]
+        for action in sorted(actions, key=actions.get, reverse=True)
+    ], headers=['ID', 'Name', 'Count'], tablefmt='simple'))
+
+
 def print_histogram(path):
     """Show operation and action histogram."""
     with open(path, 'rb') as handle:
-        size = os.fstat(handle.fileno()).st_size
-        mgz.header.parse_stream(handle)
-        operations = defaultdict(int)
-        actions = defaultdict(int)
-        labels = {}
-        fast.meta(handle)
-        while handle.tell() < size:
-            op_type, payload = fast.operation(handle)
-            operations[op_type.name] += 1
-            if op_type == fast.Operation.ACTION:
-                action_id = payload[1]
-                action_id = '{0:#0{1}x}'.format(payload[0].value, 4)
-                labels[action_id] = payload[0].name
-                actions[action_id] += 1
-        print('Operations')
-        print(tabulate([
-            [operation, operations[operation]]
-            for operation in sorted(operations, key=operations.get, reverse=True)
-        ], headers=['Name', 'Count'], tablefmt='simple'))
-        print()
-        print('Actions')
-        print(tabulate([
-            [action, labels[action], actions[action]]
-            for action in sorted(actions, key=actions.get, reverse=True)
-        ], headers=['ID', 'Name', 'Count'], tablefmt='simple'))
+        show_histogram(*get_histogram(handle))
+
+
+def run_jobs(target, func, args, show):
+    """Process recs across `args.jobs` processes, showing results in input order.
+
+    Failed recs are logged and skipped. Returns whether any failed.
+    """
+    failed = False
+    for result in mgz.batch.run(target, func, args.rec_path, workers=args.jobs, ordered=True):
+        if result.ok:
+            show(result)
+        else:
+            LOGGER.error("%s: %s", result.path, result.error)
+            failed = True
+    return failed
 
 
 async def run(args): # pylint: disable=too-many-branches
     """Entry point."""
-    if args.cmd == CMD_INFO:
+    jobs = getattr(args, 'jobs', None) is not None
+    failed = False
+    if args.cmd == CMD_INFO and jobs:
+        failed = run_jobs(Summary, get_info, args, lambda result: show_info(result.path, result.value))
+    elif args.cmd == CMD_INFO:
         for rec in args.rec_path:
             print_info(rec)
+    elif args.cmd == CMD_CHAT and jobs:
+        failed = run_jobs(Summary, get_chat, args, lambda result: show_chat(result.value))
     elif args.cmd == CMD_CHAT:
         for rec in args.rec_path:
             print_chat(rec)
+    elif args.cmd == CMD_VALIDATE and jobs:
+        def check(result):
+            if not show_valid(result.value):
+                sys.exit(1)
+        failed = run_jobs(validate, None, args, check)
     elif args.cmd == CMD_VALIDATE:
         for rec in args.rec_path:
             if not is_valid(rec):
@@ -190,12 +250,29 @@ async def run(args): # pylint: disable=too-many-branches
             dump_rec(rec)
     elif args.cmd == CMD_MERGE:
         merge_recs(args.part_one, args.part_two, args.output)
+    elif args.cmd == CMD_HISTOGRAM and jobs:
+        operations, actions = Counter(), Counter()
+        def merge(result):
+            operations.update(result.value[0])
+            actions.update(result.value[1])
+        failed = run_jobs(get_histogram, None, args, merge)
+        show_histogram(operations, actions)
     elif args.cmd == CMD_HISTOGRAM:
         for rec in args.rec_path:
             print_histogram(rec)
     elif args.cmd == CMD_PAD:
         pad_rec(args.target_size, args.rec_path, args.output)
     await asyncio.sleep(0)
+    if failed:
+        sys.exit(1)
+
+
+def add_jobs_argument(parser, note=None):
+    """Add option to process recs in parallel."""
+    help_ = 'process recs across N processes (0 for all cores)'
+    if note:
+        help_ = f'{help_}; {note}'
+    parser.add_argument('-j', '--jobs', type=int, metavar='N', help=help_)
 
 
 def get_args():
@@ -205,10 +282,13 @@ def get_args():
     subparsers.required = True
     info = subparsers.add_parser(CMD_INFO)
     info.add_argument('rec_path', nargs='+')
+    add_jobs_argument(info)
     chat = subparsers.add_parser(CMD_CHAT)
     chat.add_argument('rec_path', nargs='+')
-    validate = subparsers.add_parser(CMD_VALIDATE)
-    validate.add_argument('rec_path', nargs='+')
+    add_jobs_argument(chat)
+    validate_ = subparsers.add_parser(CMD_VALIDATE)
+    validate_.add_argument('rec_path', nargs='+')
+    add_jobs_argument(validate_)
     dump = subparsers.add_parser(CMD_DUMP)
     dump.add_argument('rec_path', nargs='+')
     merge = subparsers.add_parser(CMD_MERGE)
@@ -217,6 +297,7 @@ def get_args():
     merge.add_argument('output', default='merged.mgz')
     histogram = subparsers.add_parser(CMD_HISTOGRAM)
     histogram.add_argument('rec_path', nargs='+')
+    add_jobs_argument(histogram, 'with multiple recs, prints one merged histogram')
     pad = subparsers.add_parser(CMD_PAD)
     pad.add_argument('target_size', type=int)
     pad.add_argument('rec_path')
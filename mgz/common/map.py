@@ -101,7 +101,10 @@ def extract_from_instructions(instructions):
 
 
 def lookup_name(map_id, name, version, reference):
-    """Lookup base game map if applicable."""
+    """Lookup base game map if applicable.
+
+    `reference` is dataset reference data, indexed (int-keyed) or not.
+    """
     custom = True
     is_de = version == Version.DE
     is_hd = version == Version.HD
@@ -109,9 +112,10 @@ def lookup_name(map_id, name, version, reference):
     # 137: custom map pool
     # 138: DM custom
     if (map_id != 44 and not (is_de or is_hd)) or (map_id not in [59, 137, 138] and (is_de or is_hd)):
-        map_keys = [int(k) for k in reference['maps'].keys()]
-        if map_id in map_keys:
-            name = reference['maps'][str(map_id)]
+        maps = reference['maps']
+        key = map_id if map_id in maps else str(map_id)
+        if key in maps:
+            name = maps[key]
         elif version == Version.AOK:
             return name, False
         else:
@@ -166,6 +170,9 @@ def get_water_percent(tiles, dataset_id):
     """Get percent of map that is passable by ships."""
     if dataset_id not in WATER_TERRAIN:
         return None
+    terrain = getattr(tiles, 'terrain', None)
+    if terrain is not None:
+        return sum(terrain.count(t) for t in WATER_TERRAIN[dataset_id])/len(terrain)
     count = 0
     for tile in tiles:
         if tile[0] in WATER_TERRAIN[dataset_id]:
@@ -183,8 +190,12 @@ def get_mod_id(strings):
             return s[3].split('_')[0]
 
 
-def get_map_data(map_id, instructions, dimension, version, dataset_id, reference, tiles, de_seed=None, de_strings=[]):
-    """Get the map metadata."""
+def get_map_data(map_id, instructions, dimension, version, dataset_id, reference, tiles, de_seed=None, de_strings=[], tile_dicts=True):
+    """Get the map metadata.
+
+    If `tiles` is `None`, tiles and water are `None`. If `tile_dicts`
+    is not set, only water is derived from the tiles.
+    """
     if instructions == b'\x00':
         raise ValueError('empty instructions')
     
@@ -205,6 +216,6 @@ def get_map_data(map_id, instructions, dimension, version, dataset_id, reference
         'modes': modes,
         'custom': custom,
         'zr': name.startswith('ZR@'),
-        'tiles': list(get_tiles(tiles, dimension)),
-        'water': get_water_percent(tiles, dataset_id)
+        'tiles': list(get_tiles(tiles, dimension)) if tiles is not None and tile_dicts else None,
+        'water': get_water_percent(tiles, dataset_id) if tiles is not None else None
     }, encoding, language
@@ -1,14 +1,31 @@
 """Fast(er) parsing for situations requiring speed."""
+import collections.abc
 import io
 import struct
 
 from mgz.fast.enums import Operation, Action, Postgame, Age
-from mgz.fast.actions import parse_action_71094
-from mgz.util import check_flags, unpack
+from mgz.fast.actions import ACTIONS, parse_action_71094, parse_player
+from mgz.util import unpack
 
 
 MAX_PLAYERS = 8
 SYNC_LEN_PER_PLAYER = 11
+ACTION_PREFIX = struct.Struct('<bh')
+
+
+def sync_payload(values, current_time):
+    """Compute checksum and per player values of a DE sync."""
+    checksum = sum(values)
+    payload = {"current_time": current_time}
+    for ptr in range(0, MAX_PLAYERS * SYNC_LEN_PER_PLAYER, SYNC_LEN_PER_PLAYER):
+        if values[ptr + 1]:
+            payload[values[ptr + 8]] = {
+                'total_res': values[ptr + 1],
+                'dp_obj_count': values[ptr + 3],
+                'dp_obj_ttl': values[ptr + 4],
+                'obj_count': values[ptr + 6],
+            }
+    return checksum, payload
 
 
 def sync(data):
@@ -55,17 +72,8 @@ def sync(data):
     val  9: unknown
     val 10: unknown
     """
-    checksum = sum(values)
     current_time, = struct.unpack('<I', data.read(4))  # duration from beginning in ms
-    payload = {"current_time": current_time}
-    for ptr in range(0, MAX_PLAYERS * SYNC_LEN_PER_PLAYER, SYNC_LEN_PER_PLAYER):
-        if values[ptr + 1]:
-            payload[values[ptr + 8]] = {
-                'total_res': values[ptr + 1],
-                'dp_obj_count': values[ptr + 3],
-                'dp_obj_ttl': values[ptr + 4],
-                'obj_count': values[ptr + 6],
-            }
+    checksum, payload = sync_payload(values, current_time)
     return increment, checksum, payload
 
 
@@ -77,187 +85,98 @@ def viewlock(data):
 
 def parse_action(action_type, data):
     """Parse player, objects, and coordinates from actions."""
-    player_id, length = struct.unpack_from('<bh', data)
+    player_id, length = ACTION_PREFIX.unpack_from(data)
     if len(data) == length + 3:
         return parse_action_71094(action_type, player_id, data[3:])
-    if action_type == Action.RESIGN:
-        return dict(player_id=data[0])
-    if action_type == Action.TRIBUTE:
-        player_id, player_id_to, resource_id, amount, fee = struct.unpack_from('<bbbff', data)
-        return dict(player_id=player_id, player_id_to=player_id_to, resource_id=resource_id, amount=amount, fee=fee)
-    if action_type == Action.DE_TRIBUTE:
-        player_id, player_id_to, unknown_byte, unknown_int, wood, food, gold, stone = struct.unpack_from('<bbbiffff', data)
-        return dict(player_id=player_id,
-                    player_id_to=player_id_to,
-                    food=food,
-                    wood=wood,
-                    stone=stone,
-                    gold=gold)
-    if action_type == Action.MOVE:
-        player_id, selected, x, y = struct.unpack_from('<b6xI2f', data)
-        object_ids = []
-        if selected != 255:
-            offset = 0
-            if check_flags(struct.unpack_from('<4b', data[19:])):
-                offset = 4
-            object_ids = struct.unpack_from('<' + str(selected) + 'I', data[19 + offset:])
-        return dict(player_id=player_id, x=x, y=y, object_ids=list(object_ids))
-    if action_type == Action.CREATE:
-        player_id, x, y = struct.unpack_from('<3xhx2f', data)
-        return dict(player_id=player_id, x=x, y=y)
-    if action_type == Action.ORDER:
-        player_id, target_id, selected, x, y = struct.unpack_from('<b2xIh2x2f', data)
-        object_ids = []
-        if selected != 255:
-            offset = 0
-            if check_flags(struct.unpack_from('<4b', data[19:])):
-                offset = 4
-            object_ids = struct.unpack_from('<' + str(selected) + 'I', data[19 + offset:])
-        return dict(player_id=player_id, target_id=target_id, x=x, y=y, object_ids=list(object_ids))
-    if action_type == Action.BUILD:
-        player_id, x, y, building_id = struct.unpack_from('<xh2fI', data)
-        return dict(player_id=player_id, x=x, y=y, building_id=building_id)
-    if action_type == Action.STANCE:
-        stance_id, *object_ids = struct.unpack_from('<xb' + str(data[0]) + 'I', data)
-        return dict(object_ids=list(object_ids), stance_id=stance_id)
-    if action_type == Action.RESEARCH:
-        object_id, player_id = struct.unpack_from('<3xIh', data)
-        if len(data) >= 19:
-            technology_id, = struct.unpack_from('<I', data[11:15])
-        else:
-            technology_id, = struct.unpack_from('<h', data[9:11])
-        return dict(player_id=player_id, technology_id=technology_id, object_ids=[object_id])
-    if action_type == Action.FORMATION:
-        player_id, formation_id, *object_ids = struct.unpack_from('<xhI' + str(data[0]) + 'I', data)
-        return dict(player_id=player_id, object_ids=list(object_ids), formation_id=formation_id)
-    if action_type == Action.QUEUE:
-        object_id, unit_id, amount = struct.unpack_from('<3xIhh', data)
-        return dict(object_ids=[object_id], unit_id=unit_id, amount=amount)
-    if action_type == Action.GATHER_POINT:
-        target_id, x, y, *object_ids = struct.unpack_from('<3xi4x2f' + str(data[0]) + 'I', data)
-        return dict(object_ids=list(object_ids), x=x, y=y, target_id=target_id)
-    if action_type == Action.MULTIQUEUE:
-        unit_id, amount, *object_ids = struct.unpack_from('<3xhxb' + str(data[5]) + 'I', data)
-        return dict(object_ids=object_ids, unit_id=unit_id, amount=amount)
-    if action_type == Action.PATROL:
-        x, y, *object_ids = struct.unpack_from('<3xf36xf36x' + str(data[0]) + 'I', data)
-        return dict(object_ids=list(object_ids), x=x, y=y)
-    if action_type == Action.SPECIAL:
-        target_id, order_id, x, y, *flags = struct.unpack_from('<3xib3x2f4x4b', data)
-        offset = 0
-        if check_flags(flags):
-            offset = 4
-        object_ids = struct.unpack_from('<' + str(data[0]) + 'I', data[23 + offset:])
-        values = dict(object_ids=list(object_ids), order_id=order_id)
-        if x > 0 and y > 0:
-            values.update(dict(x=x, y=y))
-        if target_id > 0:
-            values.update(dict(target_id=target_id))
-        return values
-    if action_type == Action.BACK_TO_WORK:
-        object_id, = struct.unpack_from('<3xI', data)
-        return dict(object_ids=[object_id])
-    if action_type == Action.UNGARRISON:
-        selected, = struct.unpack_from('<h', data)
-        x, y, *object_ids = struct.unpack_from('<3x2f8x' + str(selected) + 'I', data)
-        if x > 0 and y > 0:
-            return dict(object_ids=list(object_ids), x=x, y=y)
-        return dict(object_ids=list(object_ids))
-    if action_type == Action.BUY:
-        player_id, resource_id, amount = struct.unpack_from('<bbb', data)
-        return dict(player_id=player_id, resource_id=resource_id, amount=amount)
-    if action_type == Action.SELL:
-        player_id, resource_id, amount = struct.unpack_from('<bbb', data)
-        return dict(player_id=player_id, resource_id=resource_id, amount=amount)
-    if action_type == Action.DELETE:
-        object_id, player_id = struct.unpack_from('<3x2I', data)
-        return dict(player_id=player_id, object_ids=[object_id])
-    if action_type == Action.TOWN_BELL:
-        object_id, = struct.unpack_from('<3xI', data)
-        return dict(object_ids=[object_id])
-    if action_type == Action.WALL:
-        selection_count, = struct.unpack_from('b', data)
-        offset = len(data) - selection_count * 4
-
-        if offset > 15:
-            # In DE recordings all coordinates are prefixed with a zero.
-            player_id, x_start, y_start, x_end, y_end, building_id, z1, const = struct.unpack_from(
-                '<bxbxbxbxbx2h1i', data, offset=1)
-        else:
-            player_id, x_start, y_start, x_end, y_end, building_id, z1, const = struct.unpack_from(
-                '<5bx2h1i', data, offset=1)
-
-        object_ids = struct.unpack_from('<' + str(selection_count) + 'I', data[offset:])
-
-        return dict(player_id=player_id,
-                    x=x_start,
-                    y=y_start,
-                    x_end=x_end,
-                    y_end=y_end,
-                    building_id=building_id,
-                    object_ids=object_ids)
-
-    if action_type == Action.GAME:
-        return dict(player_id=data[1], command_id=data[0])
-    if action_type == Action.FLARE:
-        x, y, player_id = struct.unpack_from('<19x2fb', data)
-        return dict(player_id=player_id, x=x, y=y)
-    if action_type == Action.REPAIR:
-        target_id, *flags = struct.unpack_from('<3xI4b', data)
-        offset = 0
-        if check_flags(flags):
-            offset = 4
-        object_ids = struct.unpack_from('<' + str(data[0]) + 'I', data[7 + offset:])
-        return dict(target_id=target_id, object_ids=list(object_ids))
-    if action_type == Action.STOP:
-        object_ids = struct.unpack_from('<x' + str(data[0]) + 'I', data)
-        return dict(object_ids=list(object_ids))
-    if action_type == Action.GATE:
-        object_id, = struct.unpack_from('<3xI', data)
-        return dict(object_ids=[object_id])
-    if action_type == Action.FOLLOW:
-        object_ids = struct.unpack_from('<7x' + str(data[0]) + 'I', data)
-        return dict(object_ids=object_ids)
-    if action_type == Action.GUARD:
-        object_ids = struct.unpack('<7x' + str(data[0]) + 'I', data)
-        return dict(object_ids=list(object_ids))
-    if action_type == Action.ATTACK_GROUND:
-        object_ids = []
-        selected, x, y, *flags = struct.unpack_from('<b2x2f4b', data)
-        offset = 0
-        if check_flags(flags):
-            offset = 4
-        if selected > 0:
-            object_ids = struct.unpack_from('<' + str(selected) + 'I', data[11 + offset:])
-        return dict(object_ids=list(object_ids), x=x, y=y)
-    if action_type == Action.ADD_WAYPOINT:
-        object_ids = []
-        selected, x, y = struct.unpack_from('<xb2b', data)
-        if selected > 0:
-            object_ids = struct.unpack_from('<4x' + str(selected) + 'I', data)
-        return dict(object_ids=list(object_ids), x=x, y=y)
-    if action_type == Action.DE_QUEUE:
-        player_id, unit_id, amount, *object_ids = struct.unpack_from('<b4xhbx' + str(data[3]) + 'I', data)
-        return dict(player_id=player_id, object_ids=object_ids, amount=amount, unit_id=unit_id)
-    if action_type == Action.DE_ATTACK_MOVE:
-        x, y, *object_ids = struct.unpack_from('<3xf36xf36x' + str(data[0]) + 'I', data)
-        return dict(object_ids=list(object_ids), x=x, y=y)
-    if action_type == Action.DE_AUTOSCOUT:
-        object_ids = struct.unpack_from('<x' + str(data[0]) + 'I', data)
-        return dict(object_ids=list(object_ids))
-    return dict()
-
-
-def action(data, sequence=None):
-    """Handle actions."""
+    parser = ACTIONS.get(action_type)
+    if parser is None:
+        return dict()
+    return parser(data)
+
+
+class LazyAction(collections.abc.Mapping):
+    """Action payload decoded on first access.
+
+    Behaves like the payload dictionary of an action, but the raw
+    bytes are only unpacked when a payload value is requested. Unlike
+    eager parsing, an undecodable payload keeps its action type and
+    is empty.
+    """
+
+    __slots__ = ['type', 'sequence', 'raw', '_payload']
+
+    def __init__(self, action_type, raw, sequence):
+        """Initialize."""
+        self.type = action_type
+        self.raw = raw
+        self.sequence = sequence
+        self._payload = None
+
+    @property
+    def player_id(self):
+        """Get player ID without decoding the payload.
+
+        The player is read from its fixed position, so it is set even
+        if the rest of the payload would not decode.
+        """
+        if self._payload is not None:
+            return self._payload.get('player_id')
+        if len(self.raw) >= ACTION_PREFIX.size:
+            player_id, length = ACTION_PREFIX.unpack_from(self.raw)
+            if len(self.raw) == length + 3:
+                return player_id
+        return parse_player(self.type, self.raw)
+
+    @property
+    def payload(self):
+        """Get decoded payload."""
+        if self._payload is None:
+            try:
+                self._payload = parse_action(self.type, self.raw)
+                self._payload['sequence'] = self.sequence
+            except struct.error:
+                self._payload = {}
+        return self._payload
+
+    def decode(self):
+        """Decode as eager parsing would, returning type and payload."""
+        if not self.payload:
+            return Action.ERROR, {}
+        return self.type, self.payload
+
+    def __getitem__(self, key):
+        return self.payload[key]
+
+    def __iter__(self):
+        return iter(self.payload)
+
+    def __len__(self):
+        return len(self.payload)
+
+    def __repr__(self):
+        return f'LazyAction({self.type}, sequence={self.sequence})'
+
+
+def action(data, sequence=None, lazy=False, actions=None):
+    """Handle actions.
+
+    If `lazy` is set, the payload is a `LazyAction`. If `actions`
+    is given, other action types are not decoded and have no payload.
+    """
     length, = struct.unpack('<I', data.read(4))
     action_id = int.from_bytes(data.read(1), 'little')
     action_bytes = data.read(length - 1)
     if sequence is None:
        sequence, = struct.unpack('<I', data.read(4))
     action_type = Action(action_id)
+    if actions is not None and action_type not in actions:
+        if action_type == Action.POSTGAME:
+            data.read()
+        return action_type, None
     if action_type == Action.POSTGAME:
         payload = dict(bytes=action_bytes + data.read())
+    elif lazy:
+        return action_type, LazyAction(action_type, action_bytes, sequence)
     else:
         try:
             payload = parse_action(action_type, action_bytes)
@@ -292,6 +211,35 @@ def save(data):
     data.read(length - pos - 8)
 
 
+def postgame_block(postgame_type, block):
+    """Handle a DE postgame block.
+
+    Returns the output key and value.
+    """
+    if postgame_type == Postgame.WORLD_TIME:
+        return 'world_time', struct.unpack('<I', block.read(4))[0]
+    elif postgame_type == Postgame.LEADERBOARDS:
+        num_leaderboards = struct.unpack('<I', block.read(4))[0]
+        leaderboards = []
+        for lb in range(0, num_leaderboards):
+            leaderboard_id, unk = struct.unpack('<IH', block.read(6))
+            num_players = struct.unpack('<I', block.read(4))[0]
+            player_data = []
+            for i in range(0, num_players):
+                player_num, rank, rating = struct.unpack('<3i', block.read(12))
+                player_data.append({
+                    'number': player_num,
+                    'rank': rank,
+                    'rating': rating
+                })
+            leaderboards.append({
+                'id': leaderboard_id,
+                'players': player_data
+            })
+        return 'leaderboards', leaderboards
+    raise RuntimeError("unparsed postgame block")
+
+
 def postgame(data):
     """Handle DE postgame."""
     data = io.BytesIO(data.read()[::-1])
@@ -301,30 +249,8 @@ def postgame(data):
     for _ in range(0, num_blocks):
         identifier, length = struct.unpack('>II', data.read(8))
         block = io.BytesIO(data.read(length)[::-1])
-        postgame_type = Postgame(identifier)
-        if postgame_type == Postgame.WORLD_TIME:
-            out['world_time'] = struct.unpack('<I', block.read(4))[0]
-        elif postgame_type == Postgame.LEADERBOARDS:
-            num_leaderboards = struct.unpack('<I', block.read(4))[0]
-            leaderboards = []
-            for lb in range(0, num_leaderboards):
-                leaderboard_id, unk = struct.unpack('<IH', block.read(6))
-                num_players = struct.unpack('<I', block.read(4))[0]
-                player_data = []
-                for i in range(0, num_players):
-                    player_num, rank, rating = struct.unpack('<3i', block.read(12))
-                    player_data.append({
-                        'number': player_num,
-                        'rank': rank,
-                        'rating': rating
-                    })
-                leaderboards.append({
-                    'id': leaderboard_id,
-                    'players': player_data
-                })
-            out['leaderboards'] = leaderboards
-        else:
-            raise RuntimeError("unparsed postgame block")
+        key, value = postgame_block(Postgame(identifier), block)
+        out[key] = value
     return out
 
 
@@ -344,24 +270,43 @@ def meta(data):
         raise ValueError("insufficient meta received")
 
 
-def operation(data):
-    """Handle body operations."""
+def operation(data, lazy=False, actions=None, operation_types=None):
+    """Handle body operations.
+
+    If `lazy` is set, action payloads are decoded on access.
+
+    If `actions` (a set of `Action`) or `operation_types` (a set of
+    `Operation`) are given, other operations are passed over and the
+    next wanted operation is returned. Unwanted actions are never
+    decoded.
+    """
     try:
-        op_id, = struct.unpack('<I', data.read(4))
-        try:
-            op_type = Operation(op_id)
-        except ValueError:
-            return Operation.SAVE, save(data)
-        if op_type == Operation.ACTION:
-            return op_type, action(data)
-        if op_type == Operation.SYNC:
-            return op_type, sync(data)
-        if op_type == Operation.VIEWLOCK:
-            return op_type, viewlock(data)
-        if op_type == Operation.CHAT:
-            return op_type, chat(data)
-        if op_type == Operation.POSTGAME:
-            return op_type, postgame(data)
+        while True:
+            op_id, = struct.unpack('<I', data.read(4))
+            try:
+                op_type = Operation(op_id)
+            except ValueError:
+                op_type = None
+            if op_type is None:
+                op_type = Operation.SAVE
+                payload = save(data)
+            elif op_type == Operation.ACTION:
+                wanted = operation_types is None or op_type in operation_types
+                payload = action(data, lazy=lazy, actions=actions if wanted else set())
+                if payload[1] is None:
+                    continue
+            elif op_type == Operation.SYNC:
+                payload = sync(data)
+            elif op_type == Operation.VIEWLOCK:
+                payload = viewlock(data)
+            elif op_type == Operation.CHAT:
+                payload = chat(data)
+            elif op_type == Operation.POSTGAME:
+                payload = postgame(data)
+            else:
+                break
+            if operation_types is None or op_type in operation_types:
+                return op_type, payload
     except struct.error:
         raise EOFError
     raise RuntimeError("unknown data received")
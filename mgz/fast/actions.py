@@ -1,138 +1,616 @@
-"""Action parsing for DE >= 71094."""
-import io
+"""Action parsing.
+
+Actions are dispatched through tables keyed by action type, with
+precompiled structures. Formats ending in a variable number of
+values (usually object IDs) are compiled once per count.
+"""
+import functools
 import struct
 
-from mgz.util import unpack, as_hex
+from mgz.util import check_flags
 from mgz.fast.enums import Action
 
 
+FLAGS = struct.Struct('<4b')
+TRIBUTE = struct.Struct('<bbbff')
+DE_TRIBUTE = struct.Struct('<bbbiffff')
+MOVE = struct.Struct('<b6xI2f')
+CREATE = struct.Struct('<3xhx2f')
+ORDER = struct.Struct('<b2xIh2x2f')
+BUILD = struct.Struct('<xh2fI')
+RESEARCH = struct.Struct('<3xIh')
+QUEUE = struct.Struct('<3xIhh')
+SPECIAL = struct.Struct('<3xib3x2f4x4b')
+OBJECT = struct.Struct('<3xI')
+SHORT = struct.Struct('<h')
+INT = struct.Struct('<I')
+UNGARRISON = struct.Struct('<3x2f8x')
+TRADE = struct.Struct('<bbb')
+DELETE = struct.Struct('<3x2I')
+SELECTION = struct.Struct('b')
+WALL_DE = struct.Struct('<bxbxbxbxbx2h1i')
+WALL = struct.Struct('<5bx2h1i')
+FLARE = struct.Struct('<19x2fb')
+REPAIR = struct.Struct('<3xI4b')
+ATTACK_GROUND = struct.Struct('<b2x2f4b')
+ADD_WAYPOINT = struct.Struct('<xb2b')
+PLAYER_BYTE = struct.Struct('b')
+PLAYER_UBYTE = struct.Struct('B')
+PLAYER_SHORT = struct.Struct('<h')
+PLAYER_INT = struct.Struct('<I')
+
+
+@functools.lru_cache(maxsize=1024)
+def counted(prefix, count, code='I'):
+    """Get structure for a prefix followed by `count` values."""
+    return struct.Struct(f'{prefix}{count}{code}')
+
+
+def object_ids(data, count, offset=0):
+    """Unpack `count` object IDs."""
+    if count == 0:
+        return []
+    return list(counted('<', count).unpack_from(data, offset))
+
+
+def flag_offset(data, offset):
+    """Offset past optional flag bytes."""
+    return 4 if check_flags(FLAGS.unpack_from(data, offset)) else 0
+
+
+def parse_resign(data):
+    """Parse resign action."""
+    return dict(player_id=data[0])
+
+
+def parse_tribute(data):
+    """Parse tribute action."""
+    player_id, player_id_to, resource_id, amount, fee = TRIBUTE.unpack_from(data)
+    return dict(player_id=player_id, player_id_to=player_id_to, resource_id=resource_id, amount=amount, fee=fee)
+
+
+def parse_de_tribute(data):
+    """Parse DE tribute action."""
+    player_id, player_id_to, unknown_byte, unknown_int, wood, food, gold, stone = DE_TRIBUTE.unpack_from(data)
+    return dict(player_id=player_id,
+                player_id_to=player_id_to,
+                food=food,
+                wood=wood,
+                stone=stone,
+                gold=gold)
+
+
+def parse_move(data):
+    """Parse move action."""
+    player_id, selected, x, y = MOVE.unpack_from(data)
+    ids = []
+    if selected != 255:
+        ids = object_ids(data, selected, 19 + flag_offset(data, 19))
+    return dict(player_id=player_id, x=x, y=y, object_ids=ids)
+
+
+def parse_create(data):
+    """Parse create action."""
+    player_id, x, y = CREATE.unpack_from(data)
+    return dict(player_id=player_id, x=x, y=y)
+
+
+def parse_order(data):
+    """Parse order action."""
+    player_id, target_id, selected, x, y = ORDER.unpack_from(data)
+    ids = []
+    if selected != 255:
+        ids = object_ids(data, selected, 19 + flag_offset(data, 19))
+    return dict(player_id=player_id, target_id=target_id, x=x, y=y, object_ids=ids)
+
+
+def parse_build(data):
+    """Parse build action."""
+    player_id, x, y, building_id = BUILD.unpack_from(data)
+    return dict(player_id=player_id, x=x, y=y, building_id=building_id)
+
+
+def parse_stance(data):
+    """Parse stance action."""
+    stance_id, *ids = counted('<xb', data[0]).unpack_from(data)
+    return dict(object_ids=ids, stance_id=stance_id)
+
+
+def parse_research(data):
+    """Parse research action."""
+    object_id, player_id = RESEARCH.unpack_from(data)
+    if len(data) >= 19:
+        technology_id, = INT.unpack_from(data, 11)
+    else:
+        technology_id, = SHORT.unpack_from(data, 9)
+    return dict(player_id=player_id, technology_id=technology_id, object_ids=[object_id])
+
+
+def parse_formation(data):
+    """Parse formation action."""
+    player_id, formation_id, *ids = counted('<xhI', data[0]).unpack_from(data)
+    return dict(player_id=player_id, object_ids=ids, formation_id=formation_id)
+
+
+def parse_queue(data):
+    """Parse queue action."""
+    object_id, unit_id, amount = QUEUE.unpack_from(data)
+    return dict(object_ids=[object_id], unit_id=unit_id, amount=amount)
+
+
+def parse_gather_point(data):
+    """Parse gather point action."""
+    target_id, x, y, *ids = counted('<3xi4x2f', data[0]).unpack_from(data)
+    return dict(object_ids=ids, x=x, y=y, target_id=target_id)
+
+
+def parse_multiqueue(data):
+    """Parse multiqueue action."""
+    unit_id, amount, *ids = counted('<3xhxb', data[5]).unpack_from(data)
+    return dict(object_ids=ids, unit_id=unit_id, amount=amount)
+
+
+def parse_patrol(data):
+    """Parse patrol action."""
+    x, y, *ids = counted('<3xf36xf36x', data[0]).unpack_from(data)
+    return dict(object_ids=ids, x=x, y=y)
+
+
+def parse_special(data):
+    """Parse special action."""
+    target_id, order_id, x, y, *flags = SPECIAL.unpack_from(data)
+    offset = 0
+    if check_flags(flags):
+        offset = 4
+    values = dict(object_ids=object_ids(data, data[0], 23 + offset), order_id=order_id)
+    if x > 0 and y > 0:
+        values.update(dict(x=x, y=y))
+    if target_id > 0:
+        values.update(dict(target_id=target_id))
+    return values
+
+
+def parse_object(data):
+    """Parse single object action."""
+    object_id, = OBJECT.unpack_from(data)
+    return dict(object_ids=[object_id])
+
+
+def parse_ungarrison(data):
+    """Parse ungarrison action."""
+    selected, = SHORT.unpack_from(data)
+    x, y, *ids = counted('<3x2f8x', selected).unpack_from(data)
+    if x > 0 and y > 0:
+        return dict(object_ids=ids, x=x, y=y)
+    return dict(object_ids=ids)
+
+
+def parse_trade(data):
+    """Parse buy or sell action."""
+    player_id, resource_id, amount = TRADE.unpack_from(data)
+    return dict(player_id=player_id, resource_id=resource_id, amount=amount)
+
+
+def parse_delete(data):
+    """Parse delete action."""
+    object_id, player_id = DELETE.unpack_from(data)
+    return dict(player_id=player_id, object_ids=[object_id])
+
+
+def parse_wall(data):
+    """Parse wall action."""
+    selection_count, = SELECTION.unpack_from(data)
+    offset = len(data) - selection_count * 4
+    if offset > 15:
+        # In DE recordings all coordinates are prefixed with a zero.
+        player_id, x_start, y_start, x_end, y_end, building_id, z1, const = WALL_DE.unpack_from(data, offset=1)
+    else:
+        player_id, x_start, y_start, x_end, y_end, building_id, z1, const = WALL.unpack_from(data, offset=1)
+    ids = counted('<', selection_count).unpack_from(data[offset:])
+    return dict(player_id=player_id,
+                x=x_start,
+                y=y_start,
+                x_end=x_end,
+                y_end=y_end,
+                building_id=building_id,
+                object_ids=ids)
+
+
+def parse_game(data):
+    """Parse game action."""
+    return dict(player_id=data[1], command_id=data[0])
+
+
+def parse_flare(data):
+    """Parse flare action."""
+    x, y, player_id = FLARE.unpack_from(data)
+    return dict(player_id=player_id, x=x, y=y)
+
+
+def parse_repair(data):
+    """Parse repair action."""
+    target_id, *flags = REPAIR.unpack_from(data)
+    offset = 0
+    if check_flags(flags):
+        offset = 4
+    return dict(target_id=target_id, object_ids=object_ids(data, data[0], 7 + offset))
+
+
+def parse_selected(data):
+    """Parse action on selected objects."""
+    return dict(object_ids=list(counted('<x', data[0]).unpack_from(data)))
+
+
+def parse_follow(data):
+    """Parse follow action."""
+    return dict(object_ids=counted('<7x', data[0]).unpack_from(data))
+
+
+def parse_guard(data):
+    """Parse guard action."""
+    return dict(object_ids=list(counted('<7x', data[0]).unpack(data)))
+
+
+def parse_attack_ground(data):
+    """Parse attack ground action."""
+    ids = []
+    selected, x, y, *flags = ATTACK_GROUND.unpack_from(data)
+    offset = 0
+    if check_flags(flags):
+        offset = 4
+    if selected > 0:
+        ids = object_ids(data, selected, 11 + offset)
+    return dict(object_ids=ids, x=x, y=y)
+
+
+def parse_add_waypoint(data):
+    """Parse add waypoint action."""
+    ids = []
+    selected, x, y = ADD_WAYPOINT.unpack_from(data)
+    if selected > 0:
+        ids = object_ids(data, selected, 4)
+    return dict(object_ids=ids, x=x, y=y)
+
+
+def parse_de_queue(data):
+    """Parse DE queue action."""
+    player_id, unit_id, amount, *ids = counted('<b4xhbx', data[3]).unpack_from(data)
+    return dict(player_id=player_id, object_ids=ids, amount=amount, unit_id=unit_id)
+
+
+ACTIONS = {
+    Action.RESIGN: parse_resign,
+    Action.TRIBUTE: parse_tribute,
+    Action.DE_TRIBUTE: parse_de_tribute,
+    Action.MOVE: parse_move,
+    Action.CREATE: parse_create,
+    Action.ORDER: parse_order,
+    Action.BUILD: parse_build,
+    Action.STANCE: parse_stance,
+    Action.RESEARCH: parse_research,
+    Action.FORMATION: parse_formation,
+    Action.QUEUE: parse_queue,
+    Action.GATHER_POINT: parse_gather_point,
+    Action.MULTIQUEUE: parse_multiqueue,
+    Action.PATROL: parse_patrol,
+    Action.SPECIAL: parse_special,
+    Action.BACK_TO_WORK: parse_object,
+    Action.UNGARRISON: parse_ungarrison,
+    Action.BUY: parse_trade,
+    Action.SELL: parse_trade,
+    Action.DELETE: parse_delete,
+    Action.TOWN_BELL: parse_object,
+    Action.WALL: parse_wall,
+    Action.GAME: parse_game,
+    Action.FLARE: parse_flare,
+    Action.REPAIR: parse_repair,
+    Action.STOP: parse_selected,
+    Action.GATE: parse_object,
+    Action.FOLLOW: parse_follow,
+    Action.GUARD: parse_guard,
+    Action.ATTACK_GROUND: parse_attack_ground,
+    Action.ADD_WAYPOINT: parse_add_waypoint,
+    Action.DE_QUEUE: parse_de_queue,
+    Action.DE_ATTACK_MOVE: parse_patrol,
+    Action.DE_AUTOSCOUT: parse_selected,
+}
+
+
+# Player field (structure and offset) of actions with a player.
+PLAYERS = {
+    Action.RESIGN: (PLAYER_UBYTE, 0),
+    Action.TRIBUTE: (PLAYER_BYTE, 0),
+    Action.DE_TRIBUTE: (PLAYER_BYTE, 0),
+    Action.MOVE: (PLAYER_BYTE, 0),
+    Action.CREATE: (PLAYER_SHORT, 3),
+    Action.ORDER: (PLAYER_BYTE, 0),
+    Action.BUILD: (PLAYER_SHORT, 1),
+    Action.RESEARCH: (PLAYER_SHORT, 7),
+    Action.FORMATION: (PLAYER_SHORT, 1),
+    Action.BUY: (PLAYER_BYTE, 0),
+    Action.SELL: (PLAYER_BYTE, 0),
+    Action.DELETE: (PLAYER_INT, 7),
+    Action.WALL: (PLAYER_BYTE, 1),
+    Action.GAME: (PLAYER_UBYTE, 1),
+    Action.FLARE: (PLAYER_BYTE, 27),
+    Action.DE_QUEUE: (PLAYER_BYTE, 0),
+}
+
+
+def parse_player(action_type, data):
+    """Read the player of an action without parsing the rest.
+
+    Returns `None` if the action has no player or is too short.
+    """
+    field = PLAYERS.get(action_type)
+    if field is None:
+        return None
+    player, offset = field
+    if len(data) < offset + player.size:
+        return None
+    return player.unpack_from(data, offset)[0]
+
+
+# DE >= 71094
+
+BYTE = struct.Struct('<b')
+RESEARCH_71094 = struct.Struct('<Ihh5x')
+GAME_DIPLOMACY_71094 = struct.Struct('<2xhhfb')
+GAME_SPEED_71094 = struct.Struct('<6xf')
+GAME_NUMBER_71094 = struct.Struct('<4xh')
+DE_QUEUE_71094 = struct.Struct('<h4xhhh4x')
+MOVE_71094 = struct.Struct('<4x2fh')
+ORDER_71094 = struct.Struct('<I2fh')
+BUILD_71094 = struct.Struct('<h2xffI8xhbb')
+GATHER_POINT_71094 = struct.Struct('<h2xffiix')
+MULTI_GATHERPOINT_71094 = struct.Struct('<iff')
+PAIR_71094 = struct.Struct('<II')
+SPECIAL_71094 = struct.Struct('<Iiff4xh2xh2x')
+TRADE_71094 = struct.Struct('<hhI')
+AI_ORDER_71094 = struct.Struct('<II4xIff')
+WALL_71094 = struct.Struct('<IHHHHI')
+PATROL_71094 = struct.Struct('<I4xf36xf36x')
+UNGARRISON_71094 = struct.Struct('<IffiI')
+FLARE_71094 = struct.Struct('<4xffb')
+TOWN_BELL_71094 = struct.Struct('<Ib')
+ATTACK_GROUND_71094 = struct.Struct('<Iff')
+DE_TRIBUTE_71094 = struct.Struct('<ffff')
+MAKE_71094 = struct.Struct('<H6xh')
+
+
+def parse_resign_71094(data):
+    """Parse resign action (DE >= 71094)."""
+    BYTE.unpack_from(data)
+    return {}
+
+
+def parse_research_71094(data):
+    """Parse research action (DE >= 71094)."""
+    object_id, selected, technology_id = RESEARCH_71094.unpack_from(data)
+    object_ids(data, selected, RESEARCH_71094.size)  # selected building IDs
+    return dict(technology_id=technology_id, object_ids=[object_id])
+
+
+def parse_game_71094(data):
+    """Parse game action (DE >= 71094)."""
+    command_id, = SHORT.unpack_from(data)
+    payload = dict(command_id=command_id)
+    if command_id == 0:
+        source_player, target_player, mode_float, mode = GAME_DIPLOMACY_71094.unpack_from(data, 2)
+        payload.update(dict(target_player_id=target_player, diplomacy_mode=mode))
+    elif command_id == 1:
+        payload['speed'], = GAME_SPEED_71094.unpack_from(data, 2)
+    elif command_id in [13, 14, 17, 18]:
+        payload['number'], = GAME_NUMBER_71094.unpack_from(data, 2)
+    return payload
+
+
+def parse_de_queue_71094(data):
+    """Parse DE queue action (DE >= 71094)."""
+    selected, building_type, unit_id, amount = DE_QUEUE_71094.unpack_from(data)
+    ids = object_ids(data, selected, DE_QUEUE_71094.size)
+    return dict(object_ids=ids, amount=amount, unit_id=unit_id)
+
+
+def parse_move_71094(data):
+    """Parse move action (DE >= 71094)."""
+    x, y, selected = MOVE_71094.unpack_from(data)
+    ids = []
+    if selected > 0:
+        ids = object_ids(data, selected, MOVE_71094.size + 6)
+    return dict(object_ids=ids, x=x, y=y)
+
+
+def parse_order_71094(data):
+    """Parse order action (DE >= 71094)."""
+    target_id, x, y, selected = ORDER_71094.unpack_from(data)
+    ids = []
+    if selected > 0:
+        ids = object_ids(data, selected, ORDER_71094.size + 6)
+    return dict(object_ids=ids, target_id=target_id, x=x, y=y)
+
+
+def parse_build_71094(data):
+    """Parse build action (DE >= 71094)."""
+    selected, x, y, building_id, unk2, unk3, unk4 = BUILD_71094.unpack_from(data)
+    ids = object_ids(data, selected, BUILD_71094.size)
+    return dict(building_id=building_id, object_ids=ids, x=x, y=y)
+
+
+def parse_gather_point_71094(data):
+    """Parse gather point action (DE >= 71094)."""
+    selected, x, y, target_id, target_type = GATHER_POINT_71094.unpack_from(data)
+    ids = object_ids(data, selected, GATHER_POINT_71094.size)
+    return dict(target_id=target_id, target_type=target_type, x=x, y=y, object_ids=ids)
+
+
+def parse_multi_gatherpoint_71094(data):
+    """Parse multi gather point action (DE >= 71094)."""
+    target_id, x, y = MULTI_GATHERPOINT_71094.unpack_from(data) # This is a best guess. There is other unknown data in the payload.
+    return dict(target_id=target_id, x=x, y=y)
+
+
+def parse_stance_71094(data):
+    """Parse stance action (DE >= 71094)."""
+    selected, stance_id = PAIR_71094.unpack_from(data)
+    return dict(stance_id=stance_id, object_ids=object_ids(data, selected, PAIR_71094.size))
+
+
+def parse_special_71094(data):
+    """Parse special action (DE >= 71094)."""
+    selected, target_id, x, y, slot_id, order_id = SPECIAL_71094.unpack_from(data)
+    ids = object_ids(data, selected, SPECIAL_71094.size)
+    return dict(order_id=order_id, slot_id=slot_id, target_id=target_id, x=x, y=y, object_ids=ids)
+
+
+def parse_formation_71094(data):
+    """Parse formation action (DE >= 71094)."""
+    selected, formation_id = PAIR_71094.unpack_from(data)
+    return dict(formation_id=formation_id, object_ids=object_ids(data, selected, PAIR_71094.size))
+
+
+def parse_trade_71094(data):
+    """Parse buy or sell action (DE >= 71094)."""
+    resource_id, amount, object_id = TRADE_71094.unpack_from(data)
+    return dict(resource_id=resource_id, amount=amount, object_ids=[object_id])
+
+
+def parse_transform_71094(data):
+    """Parse transform action (DE >= 71094)."""
+    # autoscout enable?
+    object_id, y = PAIR_71094.unpack_from(data)
+    return dict(object_ids=[object_id])
+
+
+def parse_ai_order_71094(data):
+    """Parse AI order action (DE >= 71094)."""
+    # used for autoscout moves
+    # 01 00 00 00 75 06 00 00 ff ff ff ff 21 03 00 00 00 00 30 42 00 00 a0 42 00 00 00 00 00 00 80 3f 64 ff 01 00
+    a, object_id, c, x, y = AI_ORDER_71094.unpack_from(data)
+    return dict(object_ids=[object_id], x=x, y=y)
+
+
+def parse_object_71094(data):
+    """Parse single object action (DE >= 71094)."""
+    object_id, = INT.unpack_from(data)
+    return dict(object_ids=[object_id])
+
+
+def parse_wall_71094(data):
+    """Parse wall action (DE >= 71094)."""
+    selected, x1, y1, x2, y2, building_id = WALL_71094.unpack_from(data)
+    ids = object_ids(data, selected, WALL_71094.size + 8)
+    return dict(object_ids=ids, x=x1, y=y1, x_end=x2, y_end=y2, building_id=building_id)
+
+
+def parse_patrol_71094(data):
+    """Parse patrol action (DE >= 71094)."""
+    selected, x, y = PATROL_71094.unpack_from(data)
+    return dict(object_ids=object_ids(data, selected, PATROL_71094.size), x=x, y=y)
+
+
+def parse_ungarrison_71094(data):
+    """Parse ungarrison action (DE >= 71094)."""
+    selected, x, y, target_id, unk = UNGARRISON_71094.unpack_from(data)
+    ids = object_ids(data, selected, UNGARRISON_71094.size)
+    return dict(object_ids=ids, x=x, y=y, target_id=target_id)
+
+
+def parse_flare_71094(data):
+    """Parse flare action (DE >= 71094)."""
+    x, y, num = FLARE_71094.unpack_from(data)
+    targets = list(counted('<', num, 'b').unpack_from(data, FLARE_71094.size))
+    return dict(x=x, y=y, targets=targets)
+
+
+def parse_town_bell_71094(data):
+    """Parse town bell action (DE >= 71094)."""
+    building_id, mode = TOWN_BELL_71094.unpack_from(data)
+    return dict(building_id=building_id, mode=mode)
+
+
+def parse_selected_71094(data):
+    """Parse action on selected objects (DE >= 71094)."""
+    selected, = INT.unpack_from(data)
+    return dict(object_ids=object_ids(data, selected, INT.size))
+
+
+def parse_follow_71094(data):
+    """Parse follow action (DE >= 71094)."""
+    selected, target_id = PAIR_71094.unpack_from(data)
+    return dict(object_ids=object_ids(data, selected, PAIR_71094.size), target_id=target_id)
+
+
+def parse_attack_ground_71094(data):
+    """Parse attack ground action (DE >= 71094)."""
+    selected, x, y = ATTACK_GROUND_71094.unpack_from(data)
+    ids = object_ids(data, selected, ATTACK_GROUND_71094.size + 4)
+    return dict(object_ids=ids, x=x, y=y)
+
+
+def parse_repair_71094(data):
+    """Parse repair action (DE >= 71094)."""
+    selected, target_id = PAIR_71094.unpack_from(data)
+    ids = object_ids(data, selected, PAIR_71094.size + 4)
+    return dict(object_ids=ids, target_id=target_id)
+
+
+def parse_de_tribute_71094(data):
+    """Parse DE tribute action (DE >= 71094)."""
+    wood, food, gold, stone = DE_TRIBUTE_71094.unpack_from(data)
+    # cost[4], attribute id[4]
+    offset = DE_TRIBUTE_71094.size + 16 + 8
+    target_id = bytes(data[offset:offset + 1])
+    return dict(target_player_id=target_id, food=food, wood=wood, stone=stone, gold=gold)
+
+
+def parse_make_71094(data):
+    """Parse make action (DE >= 71094)."""
+    building_id, unit_id = MAKE_71094.unpack_from(data)
+    return dict(building_id=building_id, unit_id=unit_id)
+
+
+ACTIONS_71094 = {
+    Action.RESIGN: parse_resign_71094,
+    Action.RESEARCH: parse_research_71094,
+    Action.GAME: parse_game_71094,
+    Action.DE_QUEUE: parse_de_queue_71094,
+    Action.MOVE: parse_move_71094,
+    Action.ORDER: parse_order_71094,
+    Action.BUILD: parse_build_71094,
+    Action.GATHER_POINT: parse_gather_point_71094,
+    Action.DE_MULTI_GATHERPOINT: parse_multi_gatherpoint_71094,
+    Action.STANCE: parse_stance_71094,
+    Action.SPECIAL: parse_special_71094,
+    Action.FORMATION: parse_formation_71094,
+    Action.BUY: parse_trade_71094,
+    Action.SELL: parse_trade_71094,
+    Action.DE_TRANSFORM: parse_transform_71094,
+    Action.AI_ORDER: parse_ai_order_71094,
+    Action.BACK_TO_WORK: parse_object_71094,
+    Action.DELETE: parse_object_71094,
+    Action.WALL: parse_wall_71094,
+    Action.PATROL: parse_patrol_71094,
+    Action.DE_ATTACK_MOVE: parse_patrol_71094,
+    Action.UNGARRISON: parse_ungarrison_71094,
+    Action.FLARE: parse_flare_71094,
+    Action.TOWN_BELL: parse_town_bell_71094,
+    Action.STOP: parse_selected_71094,
+    Action.FOLLOW: parse_follow_71094,
+    Action.GUARD: parse_follow_71094,
+    Action.ATTACK_GROUND: parse_attack_ground_71094,
+    Action.REPAIR: parse_repair_71094,
+    Action.DE_TRIBUTE: parse_de_tribute_71094,
+    Action.GATE: parse_object_71094,
+    Action.DROP_RELIC: parse_object_71094,
+    Action.DE_AUTOSCOUT: parse_selected_71094,
+    Action.RATHA_ABILITY: parse_selected_71094,
+    Action.MAKE: parse_make_71094,
+}
+
+
 def parse_action_71094(action_type, player_id, raw):
-    data = io.BytesIO(raw)
-    payload = {}
-    if action_type is Action.RESIGN:
-        unpack('<b', data)
-    if action_type is Action.RESEARCH:
-        object_id, selected, technology_id = unpack('<Ihh5x', data)
-        selected_building_ids = unpack(f'<{selected}I', data, shorten=False)
-        payload = dict(technology_id=technology_id, object_ids=[object_id])
-    if action_type is Action.GAME:
-        command_id = unpack('<h', data)
-        payload = dict(command_id=command_id)
-        if command_id == 0:
-            source_player, target_player, mode_float, mode = unpack('<2xhhfb', data)
-            payload.update(dict(target_player_id=target_player, diplomacy_mode=mode))
-        elif command_id == 1:
-            payload['speed'] = unpack('<6xf', data)
-        elif command_id in [13, 14, 17, 18]:
-            payload['number'] = unpack('<4xh', data)
-    if action_type is Action.DE_QUEUE:
-        selected, building_type, unit_id, amount, *object_ids = unpack('<h4xhhh4x', data)
-        object_ids = list(unpack(f'<{selected}I', data, shorten=False))
-        payload = dict(object_ids=object_ids, amount=amount, unit_id=unit_id)
-    if action_type is Action.MOVE:
-        x, y, selected = unpack('<4x2fh', data)
-        object_ids = []
-        data.read(6)
-        if selected > 0:
-            object_ids = list(unpack(f'<{selected}I', data, shorten=False))
-        payload = dict(object_ids=object_ids, x=x, y=y)
-    if action_type is Action.ORDER:
-        target_id, x, y, selected = unpack('<I2fh', data)
-        object_ids = []
-        data.read(6)
-        if selected > 0:
-            object_ids = list(unpack(f'<{selected}I', data, shorten=False))
-        payload = dict(object_ids=object_ids, target_id=target_id, x=x, y=y)
-    if action_type is Action.BUILD:
-        selected, x, y, building_id, unk2, unk3, unk4 = unpack('<h2xffI8xhbb', data)
-        object_ids = list(unpack(f'{selected}I', data, shorten=False))
-        payload = dict(building_id=building_id, object_ids=object_ids, x=x, y=y)
-    if action_type is Action.GATHER_POINT:
-        selected, x, y, target_id, target_type = unpack('<h2xffiix', data)
-        object_ids = list(unpack(f'{selected}I', data, shorten=False))
-        payload = dict(target_id=target_id, target_type=target_type, x=x, y=y, object_ids=object_ids)
-    if action_type is Action.DE_MULTI_GATHERPOINT:
-        target_id, x, y = unpack('<iff', data) # This is a best guess. There is other unknown data in the payload.
-        payload = dict(target_id=target_id, x=x, y=y)
-    if action_type is Action.STANCE:
-        selected, stance_id = unpack('<II', data)
-        object_ids = list(unpack(f'{selected}I', data, shorten=False))
-        payload = dict(stance_id=stance_id, object_ids=object_ids)
-    if action_type is Action.SPECIAL:
-        selected, target_id, x, y, slot_id, order_id = unpack('<Iiff4xh2xh2x', data)
-        object_ids = list(unpack(f'{selected}I', data, shorten=False))
-        payload = dict(order_id=order_id, slot_id=slot_id, target_id=target_id, x=x, y=y, object_ids=object_ids)
-    if action_type is Action.FORMATION:
-        selected, formation_id = unpack('<II', data)
-        object_ids = list(unpack(f'{selected}I', data, shorten=False))
-        payload = dict(formation_id=formation_id, object_ids=object_ids)
-    if action_type in [Action.BUY, Action.SELL]:
-        resource_id, amount, object_id = unpack('<hhI', data)
-        payload = dict(resource_id=resource_id, amount=amount, object_ids=[object_id])
-    if action_type is Action.DE_TRANSFORM:
-        # autoscout enable?
-        object_id, y = unpack('<II', data)
-        payload = dict(object_ids=[object_id])
-    if action_type is Action.AI_ORDER:
-        # used for autoscout moves
-        # 01 00 00 00 75 06 00 00 ff ff ff ff 21 03 00 00 00 00 30 42 00 00 a0 42 00 00 00 00 00 00 80 3f 64 ff 01 00
-        a, object_id, c, x, y = unpack('<II4xIff', data)
-        payload = dict(object_ids=[object_id], x=x, y=y)
-    if action_type in [Action.BACK_TO_WORK, Action.DELETE]:
-        object_id = unpack('<I', data)
-        payload = dict(object_ids=[object_id])
-    if action_type is Action.WALL:
-        selected, x1, y1, x2, y2, building_id = unpack('<IHHHHI', data)
-        data.read(8)
-        object_ids = list(unpack(f'{selected}I', data, shorten=False))
-        payload = dict(object_ids=object_ids, x=x1, y=y1, x_end=x2, y_end=y2, building_id=building_id)
-    if action_type in [Action.PATROL, Action.DE_ATTACK_MOVE]:
-        selected, x, y = unpack('<I4xf36xf36x', data)
-        object_ids = list(unpack(f'{selected}I', data, shorten=False))
-        payload = dict(object_ids=object_ids, x=x, y=y)
-    if action_type is Action.UNGARRISON:
-        selected, x, y, target_id, unk = unpack('<IffiI', data)
-        object_ids = list(unpack(f'{selected}I', data, shorten=False))
-        payload = dict(object_ids=object_ids, x=x, y=y, target_id=target_id)
-    if action_type is Action.FLARE:
-        x, y, num = unpack('<4xffb', data)
-        targets = list(unpack(f'<{num}b', data, shorten=False))
-        payload = dict(x=x, y=y, targets=targets)
-    if action_type is Action.TOWN_BELL:
-        building_id, mode = unpack('<Ib',data)
-        payload = dict(building_id=building_id, mode=mode)
-    if action_type is Action.STOP:
-        selected = unpack('<I', data)
-        object_ids = list(unpack(f'{selected}I', data, shorten=False))
-        payload = dict(object_ids=object_ids)
-    if action_type in [Action.FOLLOW, Action.GUARD]:
-        selected, target_id = unpack('<II', data)
-        object_ids = list(unpack(f'{selected}I', data, shorten=False))
-        payload = dict(object_ids=object_ids, target_id=target_id)
-    if action_type is Action.ATTACK_GROUND:
-        selected, x, y = unpack('<Iff', data)
-        data.read(4)
-        object_ids = list(unpack(f'{selected}I', data, shorten=False))
-        payload = dict(object_ids=object_ids, x=x, y=y)
-    if action_type is Action.REPAIR:
-        selected, target_id = unpack('<II', data)
-        data.read(4)
-        object_ids = list(unpack(f'{selected}I', data, shorten=False))
-        payload = dict(object_ids=object_ids, target_id=target_id)
-    if action_type is Action.DE_TRIBUTE:
-        wood, food, gold, stone = unpack('<ffff', data)
-        data.read(16) # cost[4]
-        data.read(8) # attribute id[4]
-        target_id = data.read(1)
-        payload = dict(target_player_id=target_id, food=food, wood=wood, stone=stone, gold=gold)
-    if action_type in [Action.GATE, Action.DROP_RELIC]:
-        object_id = unpack('<I', data)
-        payload = dict(object_ids=[object_id])
-    if action_type in [Action.DE_AUTOSCOUT, Action.RATHA_ABILITY]:
-        selected = unpack('<I', data)
-        object_ids = list(unpack(f'{selected}I', data, shorten=False))
-        payload = dict(object_ids=object_ids)
-    if action_type is Action.MAKE:
-        building_id, unit_id = unpack('<H6xh', data)
-        payload = dict(building_id=building_id, unit_id=unit_id)
+    """Parse actions for DE >= 71094."""
+    parser = ACTIONS_71094.get(action_type)
+    payload = parser(raw) if parser else {}
     return dict(player_id=player_id, **payload)
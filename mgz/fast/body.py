@@ -0,0 +1,406 @@
+"""Fast(er) body parsing over an in-memory buffer.
+
+Mirrors `mgz.fast.operation`, but walks a single buffer (bytes,
+memoryview or mmap) with `struct.unpack_from` and an integer offset
+instead of issuing many small reads and seeks on a file handle.
+
+Offsets are absolute file positions (saved chapters point to
+absolute offsets), so the buffer must hold the whole file.
+"""
+import array
+import collections
+import io
+import struct
+import sys
+
+from mgz.fast import Operation, Action, LazyAction, MAX_PLAYERS, SYNC_LEN_PER_PLAYER, parse_action, postgame as parse_postgame, sync_payload
+
+
+UINT = struct.Struct('<I')
+UINT_PAIR = struct.Struct('<II')
+SYNC_CHECKSUM = struct.Struct('<4xI4xI')
+SYNC_VALUES = struct.Struct(f'<{MAX_PLAYERS * SYNC_LEN_PER_PLAYER}I')
+VIEWLOCK = struct.Struct('<ff4x')
+ACTION_HEADER = struct.Struct('<IB')
+META = struct.Struct('<III')
+SYNC_DE_LENGTH = 8 + SYNC_VALUES.size + 4
+SYNC_FIELDS = [
+    'unknown_0', 'total_res', 'unknown_2', 'dp_obj_count', 'dp_obj_ttl', 'unknown_5',
+    'obj_count', 'unknown_7', 'player_number', 'unknown_9', 'unknown_10'
+]
+OPERATIONS = {op.value: op for op in Operation}
+ACTIONS = {action.value: action for action in Action}
+
+
+def sync(data, pos):
+    """Handle synchronizations.
+
+    See `mgz.fast.sync` for details.
+    """
+    increment, marker = UINT_PAIR.unpack_from(data, pos)
+    if marker:
+        return (increment, None, {}), pos + 4
+    checksum, is_de = SYNC_CHECKSUM.unpack_from(data, pos + 8)
+    if not is_de:
+        return (increment, checksum, {}), pos + 32
+    values = SYNC_VALUES.unpack_from(data, pos + 8)
+    pos += 8 + SYNC_VALUES.size
+    current_time, = UINT.unpack_from(data, pos)
+    checksum, payload = sync_payload(values, current_time)
+    return (increment, checksum, payload), pos + 4
+
+
+def viewlock(data, pos):
+    """Handle viewlocks."""
+    return VIEWLOCK.unpack_from(data, pos), pos + VIEWLOCK.size
+
+
+def action_end(data, start, length):
+    """Find the end of an action payload starting at `start`."""
+    end = start + length - 1
+    if end < start:
+        # Same as reading a negative length from a handle: consume everything.
+        end = len(data)
+    return end
+
+
+def action(data, pos, lazy=False):
+    """Handle actions.
+
+    If `lazy` is set, the payload is a `LazyAction`.
+    """
+    length, action_id = ACTION_HEADER.unpack_from(data, pos)
+    start = pos + 5
+    end = action_end(data, start, length)
+    sequence, = UINT.unpack_from(data, end)
+    action_type = ACTIONS.get(action_id) or Action(action_id)
+    if action_type is Action.POSTGAME:
+        payload = dict(bytes=bytes(data[start:end]) + bytes(data[end + 4:]))
+        return (action_type, dict(payload, sequence=sequence)), len(data)
+    if lazy:
+        return (action_type, LazyAction(action_type, data[start:end], sequence)), end + 4
+    try:
+        payload = parse_action(action_type, data[start:end])
+    except struct.error:
+        return (Action.ERROR, {}), end + 4
+    payload["sequence"] = sequence
+    return (action_type, payload), end + 4
+
+
+def chat(data, pos):
+    """Handle chat."""
+    _, length = UINT_PAIR.unpack_from(data, pos)
+    pos += 8
+    return bytes(data[pos:pos + length]), pos + length
+
+
+def save(data, pos):
+    """Handle saved chapter.
+
+    `pos` is the start of the operation, since the operation
+    identifier is part of the chapter.
+    """
+    length, _ = UINT_PAIR.unpack_from(data, pos)
+    if length < pos + 8:
+        return None, len(data)
+    return None, length
+
+
+def postgame(data, pos):
+    """Handle DE postgame."""
+    return parse_postgame(io.BytesIO(data[pos:])), len(data)
+
+
+def meta(data, pos=0):
+    """Handle log meta.
+
+    Returns the offset of the first operation.
+    """
+    try:
+        first, = UINT.unpack_from(data, pos)
+        if first != 500:  # Not AOK
+            pos += 4
+        pos += 24
+        a, b, _ = META.unpack_from(data, pos)
+        pos += 12
+        if a != 0:  # AOC 1.0x
+            pos -= 12
+        if b == 2:  # DE
+            pos -= 8
+    except struct.error:
+        raise ValueError("insufficient meta received")
+    return pos
+
+
+def operation(data, pos, lazy=False):
+    """Handle body operations.
+
+    Returns the operation and the offset of the next operation.
+    If `lazy` is set, action payloads are decoded on access.
+    """
+    try:
+        op_id, = UINT.unpack_from(data, pos)
+        op_type = OPERATIONS.get(op_id)
+        if op_type is None:
+            payload, pos = save(data, pos)
+            return (Operation.SAVE, payload), pos
+        pos += 4
+        if op_type is Operation.ACTION:
+            payload, pos = action(data, pos, lazy)
+        elif op_type is Operation.SYNC:
+            payload, pos = sync(data, pos)
+        elif op_type is Operation.VIEWLOCK:
+            payload, pos = viewlock(data, pos)
+        elif op_type is Operation.CHAT:
+            payload, pos = chat(data, pos)
+        elif op_type is Operation.POSTGAME:
+            payload, pos = postgame(data, pos)
+        else:
+            raise RuntimeError("unknown data received")
+    except struct.error:
+        raise EOFError
+    return (op_type, payload), pos
+
+
+def operations(data, pos, lazy=False, actions=None, operation_types=None):
+    """Iterate over body operations starting at an offset.
+
+    Syncs and viewlocks make up the vast majority of operations,
+    so they are decoded inline to save on function calls. If `lazy`
+    is set, action payloads are decoded on access.
+
+    If `actions` (a set of `Action`) or `operation_types` (a set of
+    `Operation`) are given, other operations are skipped over by
+    length and never decoded.
+    """
+    data = memoryview(data)
+    sync_op = Operation.SYNC
+    viewlock_op = Operation.VIEWLOCK
+    syncs = operation_types is None or sync_op in operation_types
+    viewlocks = operation_types is None or viewlock_op in operation_types
+    try:
+        while True:
+            op_id, = UINT.unpack_from(data, pos)
+            if op_id == 2:
+                increment, marker = UINT_PAIR.unpack_from(data, pos + 4)
+                if marker:
+                    pos += 8
+                    if syncs:
+                        yield sync_op, (increment, None, {})
+                    continue
+            elif op_id == 3:
+                if viewlocks:
+                    yield viewlock_op, VIEWLOCK.unpack_from(data, pos + 4)
+                pos += 16
+                continue
+            if operation_types is not None and OPERATIONS.get(op_id, Operation.SAVE) not in operation_types:
+                pos = boundary(data, pos)[3]
+                continue
+            if op_id == 1 and actions is not None:
+                _, action_id = ACTION_HEADER.unpack_from(data, pos + 4)
+                if ACTIONS.get(action_id) not in actions:
+                    pos = boundary(data, pos)[3]
+                    continue
+            op, pos = operation(data, pos, lazy)
+            yield op
+    except (struct.error, EOFError):
+        return
+
+
+class Index:
+    """Compact index of body operations.
+
+    One entry per operation, stored in parallel arrays:
+    - offsets: absolute offset of the operation
+    - types: operation type value
+    - actions: action type value (-1 if not an action)
+    - lengths: action length (0 if not an action)
+    """
+
+    def __init__(self):
+        """Initialize."""
+        self.offsets = array.array('Q')
+        self.types = array.array('B')
+        self.actions = array.array('h')
+        self.lengths = array.array('I')
+
+    def __len__(self):
+        """Number of operations."""
+        return len(self.offsets)
+
+    def count(self, op_type):
+        """Count operations of a type."""
+        return self.types.count(op_type.value)
+
+    def operation_counts(self):
+        """Count operations by type."""
+        return collections.Counter({Operation(k): v for k, v in collections.Counter(self.types).items()})
+
+    def action_counts(self):
+        """Count actions by action type value."""
+        counts = collections.Counter(self.actions)
+        counts.pop(-1, None)
+        return counts
+
+    def operation(self, data, i):
+        """Decode the i-th operation."""
+        return operation(data, self.offsets[i])[0]
+
+
+def boundary(data, pos):
+    """Find the extent of an operation without decoding it.
+
+    Returns the operation type value, action type value (-1 if not
+    an action), action length (0 if not an action) and the offset
+    of the next operation.
+    """
+    size = len(data)
+    action_id = -1
+    length = 0
+    try:
+        op_id, = UINT.unpack_from(data, pos)
+        if op_id == 2:
+            _, marker = UINT_PAIR.unpack_from(data, pos + 4)
+            if marker:
+                end = pos + 8
+            else:
+                is_de, = UINT.unpack_from(data, pos + 24)
+                end = pos + 4 + (SYNC_DE_LENGTH if is_de else 32)
+        elif op_id == 3:
+            end = pos + 4 + VIEWLOCK.size
+        elif op_id == 1:
+            length, action_id = ACTION_HEADER.unpack_from(data, pos + 4)
+            end = action_end(data, pos + 9, length) + 4
+            if action_id == Action.POSTGAME.value and end <= size:
+                end = size
+        elif op_id == 4:
+            _, chat_length = UINT_PAIR.unpack_from(data, pos + 4)
+            end = pos + 12 + chat_length
+        elif op_id == Operation.POSTGAME.value:
+            end = size
+        elif op_id in OPERATIONS:
+            raise RuntimeError("unknown data received")
+        else:
+            op_id = Operation.SAVE.value
+            _, end = save(data, pos)
+    except struct.error:
+        raise EOFError
+    if end > size:
+        raise EOFError
+    return op_id, action_id, length, end
+
+
+def skip(data, pos, count):
+    """Find the offset after `count` operations, without decoding them."""
+    data = memoryview(data)
+    for _ in range(count):
+        pos = boundary(data, pos)[3]
+    return pos
+
+
+def index(data, pos):
+    """Index body operations starting at an offset.
+
+    Only operation boundaries are read; payloads are not decoded.
+    A truncated trailing operation is not indexed.
+    """
+    data = memoryview(data)
+    out = Index()
+    offsets = out.offsets.append
+    types = out.types.append
+    actions = out.actions.append
+    lengths = out.lengths.append
+    while True:
+        try:
+            op_id, action_id, length, end = boundary(data, pos)
+        except EOFError:
+            break
+        offsets(pos)
+        types(op_id)
+        actions(action_id)
+        lengths(length)
+        pos = end
+    return out
+
+
+class Syncs:
+    """DE sync checksum blocks, decoded in bulk.
+
+    One entry per DE sync, stored in arrays:
+    - timestamps: game time (sum of sync increments) in milliseconds
+    - current_times: current time reported by the sync
+    - values: the raw per-player blocks, `MAX_PLAYERS` x
+      `SYNC_LEN_PER_PLAYER` values per sync (see `SYNC_FIELDS`)
+    """
+
+    def __init__(self):
+        """Initialize."""
+        self.timestamps = array.array('Q')
+        self.current_times = array.array('I')
+        self.values = array.array('I')
+
+    def __len__(self):
+        """Number of syncs."""
+        return len(self.timestamps)
+
+    def grid(self):
+        """Values as a (syncs x players x fields) memoryview."""
+        if not self:
+            return memoryview(self.values)
+        return memoryview(self.values).cast('B').cast('I', (len(self), MAX_PLAYERS, SYNC_LEN_PER_PLAYER))
+
+    def field(self, name):
+        """Values of one field, flattened as (syncs x players)."""
+        return self.values[SYNC_FIELDS.index(name)::SYNC_LEN_PER_PLAYER]
+
+    def to_numpy(self):
+        """Values as a (syncs x players x fields) NumPy array (without copying).
+
+        Requires `numpy`.
+        """
+        import numpy
+        return numpy.frombuffer(self.values, dtype=numpy.uint32).reshape(len(self), MAX_PLAYERS, SYNC_LEN_PER_PLAYER)
+
+
+def syncs(data, pos):
+    """Collect DE sync blocks starting at an offset.
+
+    Raw blocks are copied into one contiguous array and decoded
+    together, rather than unpacked and turned into dicts one by one.
+    """
+    data = memoryview(data)
+    out = Syncs()
+    blocks = bytearray()
+    timestamp = 0
+    timestamps = out.timestamps.append
+    current_times = out.current_times.append
+    size = len(data)
+    try:
+        while True:
+            op_id, = UINT.unpack_from(data, pos)
+            if op_id == 3:
+                pos += 16
+                continue
+            if op_id != 2:
+                pos = boundary(data, pos)[3]
+                continue
+            increment, marker = UINT_PAIR.unpack_from(data, pos + 4)
+            if marker:
+                pos += 8
+            elif UINT.unpack_from(data, pos + 24)[0]:
+                end = pos + 4 + SYNC_DE_LENGTH
+                if end > size:
+                    break
+                blocks += data[pos + 12:end - 4]
+                timestamps(timestamp + increment)
+                current_times(UINT.unpack_from(data, end - 4)[0])
+                pos = end
+            else:
+                pos += 36
+            timestamp += increment
+    except (struct.error, EOFError):
+        pass
+    out.values.frombytes(blocks)
+    if sys.byteorder == 'big':
+        out.values.byteswap()
+    return out
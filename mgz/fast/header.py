@@ -1,4 +1,6 @@
 """Fast(er) parsing for recorded game headers."""
+import array
+import collections.abc
 import io
 import hashlib
 import re
@@ -9,13 +11,20 @@ import zlib
 from mgz.util import get_version, unpack, Version, as_hex
 
 PLAYER_END = b'\xff\xff\xff\xff\xff\xff\xff\xff.\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x0b'
+PLAYER_END_SEARCH = re.compile(PLAYER_END, re.DOTALL)
+OBJECT_START_SEARCH = re.compile(b'\x0b\x00.\x00\x00\x00\x02\x00\x00', re.DOTALL)
+AI_END_SEARCH = re.compile(b'\00' * 4096)
 ZLIB_WBITS = -15
+INFLATE_CHUNK_SIZE = 4096
+SECTIONS = ['de', 'hd', 'metadata', 'map', 'players', 'scenario', 'lobby']
 CLASSES = [b'\x0a', b'\x1e', b'\x46', b'\x50', b'\x14']
 BLOCK_END = b'\x00\x0b'
 REGEXES = {}
-SKIP_OBJECTS = [
-    (b'\x1e\x00\x87\x02', 252)  # 647: junk DE object, thousands per file
-]
+SKIP_OBJECTS = {
+    b'\x1e\x00\x87\x02'  # 647: junk DE object, thousands per file
+}
+OBJECT_HEADER_SIZE = 31
+OBJECT_ID = struct.Struct('<bxH')
 
 
 def _compile_object_search():
@@ -29,6 +38,17 @@ def _compile_object_search():
 _compile_object_search()
 
 
+def find(data, sub):
+    """Find bytes after the current position, relative to it.
+
+    Searches the underlying buffer rather than a copy of the remainder,
+    and does not move the position.
+    """
+    cur = data.tell()
+    pos = data.getvalue().find(sub, cur)
+    return pos - cur if pos >= 0 else -1
+
+
 def aoc_string(data):
     """Read AOC string."""
     length = unpack('<h', data)
@@ -55,6 +75,48 @@ def hd_string(data):
     return unpack(f'<{length}s', data)
 
 
+def object_filter(class_ids=None, object_ids=None, players=None):
+    """Build an object predicate for `parse`.
+
+    Each argument is a collection of allowed values, or `None` to
+    allow any.
+    """
+    def predicate(player_number, class_id, object_id):
+        return (
+            (class_ids is None or class_id in class_ids) and
+            (object_ids is None or object_id in object_ids) and
+            (players is None or player_number in players)
+        )
+    return predicate
+
+
+class TileView(collections.abc.Sequence):
+    """Map tiles as `(terrain, elevation)` pairs over the decoded grids.
+
+    Pairs are built on access, so the grids are the only storage.
+    """
+
+    __slots__ = ['terrain', 'elevation']
+
+    def __init__(self, terrain, elevation):
+        """Initialize."""
+        self.terrain = terrain
+        self.elevation = elevation
+
+    def __len__(self):
+        return len(self.terrain)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(zip(self.terrain[i], self.elevation[i]))
+        return self.terrain[i], self.elevation[i]
+
+    def __eq__(self, other):
+        if isinstance(other, TileView):
+            return self.terrain == other.terrain and self.elevation == other.elevation
+        return list(self) == other
+
+
 def parse_object(data, offset):
     """Parse an object."""
     class_id, object_id, instance_id, pos_x, pos_y = struct.unpack_from('<bxH14xIxff', data, offset)
@@ -69,32 +131,36 @@ def parse_object(data, offset):
     )
 
 
-def object_block(data, pos, player_number, index):
-    """Parse a block of objects."""
+def object_block(data, pos, player_number, index, objects_filter=None):
+    """Parse a block of objects.
+
+    The next block end is remembered between objects, so the data
+    between objects is only scanned once. Objects rejected by
+    `objects_filter` are not materialized.
+    """
     objects = []
-    offset = None
+    search = REGEXES[player_number].search
+    block_end = -1
     while True:
-        if not offset:
-            match = REGEXES[player_number].search(data, pos, pos + 10000)
-            end = data.find(BLOCK_END, pos) - pos + len(BLOCK_END)
-            if match is None:
-                break
-            offset = match.start() - pos
-            while end + 8 < offset:
-                end += data.find(BLOCK_END, pos + end) - (pos + end) + len(BLOCK_END)
-        if end + 8 == offset:
+        match = search(data, pos, pos + 10000)
+        if block_end < pos:
+            block_end = data.find(BLOCK_END, pos)
+        end = block_end + len(BLOCK_END)
+        if match is None:
             break
-        pos += offset
-        # Speed optimization: Skip specified fixed-length objects.
-        test = data[pos:pos + 4]
-        for fingerprint, offset in SKIP_OBJECTS:
-            if test == fingerprint:
-                break
-        else:
-            objects.append(dict(parse_object(data, pos), index=index))
-        offset = None
-        pos += 31
-    return objects, pos + end
+        start = match.start()
+        while end + 8 < start:
+            block_end = data.find(BLOCK_END, end)
+            end = block_end + len(BLOCK_END)
+        if end + 8 == start:
+            break
+        pos = start
+        # Speed optimization: Skip specified objects without parsing them.
+        if data[pos:pos + 4] not in SKIP_OBJECTS:
+            if objects_filter is None or objects_filter(player_number, *OBJECT_ID.unpack_from(data, pos)):
+                objects.append(dict(parse_object(data, pos), index=index))
+        pos += OBJECT_HEADER_SIZE
+    return objects, end
 
 
 def parse_mod(header, num_players, version):
@@ -109,7 +175,7 @@ def parse_mod(header, num_players, version):
         return number // 1000, '.'.join(list(str(number % 1000)))
 
 
-def parse_player(header, player_number, num_players, save):
+def parse_player(header, player_number, num_players, save, objects_filter=None):
     """Parse a player (and objects)."""
     rep = 9
     if save >= 61.5:
@@ -119,35 +185,33 @@ def parse_player(header, player_number, num_players, save):
     resources_len = 8 if save >= 63 else 4
     header.read(resources * resources_len)
     start_x, start_y, civilization_id, color_id = unpack('<xff9xb3xbx', header)
-    offset = header.tell()
-    data = header.read()
+    data = header.getvalue()
     # Skips thousands of bytes that are not easy to parse.
-    object_start = re.search(b'\x0b\x00.\x00\x00\x00\x02\x00\x00', data, re.DOTALL)
+    object_start = OBJECT_START_SEARCH.search(data, header.tell())
     if not object_start:
         raise RuntimeError("could not find object start")
     start = object_start.end()
-    objects, end = object_block(data, start, player_number, 0)
-    sleeping, end = object_block(data, end, player_number, 1)
-    doppel, end = object_block(data, end, player_number, 2)
+    objects, end = object_block(data, start, player_number, 0, objects_filter)
+    sleeping, end = object_block(data, end, player_number, 1, objects_filter)
+    doppel, end = object_block(data, end, player_number, 2, objects_filter)
     if data[end + 8:end + 10] == BLOCK_END:
         end += 10
     if data[end:end + 2] == BLOCK_END:
         end += 2
-    header.seek(offset + end)
+    header.seek(end)
     device = 0
     if save >= 37:
         offset = header.tell()
         data = header.read(100)
         device = data[8]
         # Jump to the end of player data
-        player_end = re.search(PLAYER_END, data, re.DOTALL)
+        player_end = PLAYER_END_SEARCH.search(data)
         if not player_end:
             # Normally this is 26 bytes in,
             # But in some cases (probably where object parsing failed),
-            # it can be tens of thousands of bytes. So we have to `read()` everything
-            offset = header.tell()
-            data = header.read()
-            player_end = re.search(PLAYER_END, data, re.DOTALL)
+            # it can be tens of thousands of bytes. So we have to search everything
+            offset = 0
+            player_end = PLAYER_END_SEARCH.search(header.getvalue(), header.tell())
             if not player_end and player_number < num_players - 1:
                 # this issue happens on restored games
                 # only a failure if this is not the last player, since we seek to the next block anyway
@@ -214,12 +278,18 @@ def parse_lobby(data, version, save):
 
 
 def parse_map(data, version, save):
-    """Parse map."""
-    tile_format = '<xbbx'
+    """Parse map.
+
+    Tiles are decoded into row-major `terrain` and `elevation` grids
+    (signed bytes) with strided slices of the tile data. `tiles` is a
+    `TileView` of `(terrain, elevation)` pairs over the same grids.
+    """
+    # Tile size, terrain offset and elevation offset
+    tile_layout = 4, 1, 2
     if version is Version.DE:
-        tile_format = '<bxb6x'
+        tile_layout = 9, 0, 2
         if save >= 62.0:
-            tile_format = '<bxxb6x'
+            tile_layout = 10, 0, 3
         data.read(8)
     size_x, size_y, zone_num = unpack('<III', data)
     tile_num = size_x * size_y
@@ -232,7 +302,12 @@ def parse_map(data, version, save):
         data.read(num_floats * 4)
         data.read(4)
     all_visible = unpack('<bx', data)
-    tiles = [unpack(tile_format, data) for _ in range(tile_num)]
+    tile_size, terrain_offset, elevation_offset = tile_layout
+    tiles = data.read(tile_num * tile_size)
+    if len(tiles) != tile_num * tile_size:
+        raise ValueError("tiles are truncated")
+    terrain = array.array('b', tiles[terrain_offset::tile_size])
+    elevation = array.array('b', tiles[elevation_offset::tile_size])
     num_data = unpack('<I4x', data)
     data.read(num_data * 4)
     for _ in range(0, num_data):
@@ -249,7 +324,9 @@ def parse_map(data, version, save):
         all_visible=all_visible == 1,
         restore_time=restore_time,
         dimension=size_x,
-        tiles=tiles
+        tiles=TileView(terrain, elevation),
+        terrain=terrain,
+        elevation=elevation
     )
 
 
@@ -308,7 +385,6 @@ def parse_scenario(data, num_players, version, save):
     if version is Version.HD:
         data.read(16)
     map_id, difficulty_id = unpack('<II', data)
-    remainder = data.read()
     if version is Version.DE:
         if save >= 66.3:
             settings_version = 4.5
@@ -332,10 +408,10 @@ def parse_scenario(data, num_players, version, save):
             settings_version = 2.4
         else:
             settings_version = 2.2
-        end = remainder.find(struct.pack('<d', settings_version)) + 8
+        end = find(data, struct.pack('<d', settings_version)) + 8
     else:
-        end = remainder.find(b'\x9a\x99\x99\x99\x99\x99\xf9\x3f') + 13
-    data.seek(end - len(remainder), 1)
+        end = find(data, b'\x9a\x99\x99\x99\x99\x99\xf9\x3f') + 13
+    data.seek(end, 1)
 
     if version is Version.DE:
         data.read(1)
@@ -664,6 +740,90 @@ def decompress(data):
     return io.BytesIO(zlib.decompress(zlib_header, wbits=ZLIB_WBITS))
 
 
+class Inflater:
+    """Header stream that decompresses only as far as it is read.
+
+    Supports the subset of `io.BytesIO` used by the header parsers.
+    The underlying handle is left where `decompress` would leave it
+    (at the log version); compressed bytes are read from it on demand.
+    """
+
+    def __init__(self, data, start, end):
+        """Initialize."""
+        self._data = data
+        self._source = start
+        self._end = end
+        self._decompressor = zlib.decompressobj(wbits=ZLIB_WBITS)
+        self._buffer = bytearray()
+        self._value = b''
+        self._pos = 0
+
+    def _fill(self, size):
+        """Decompress until `size` bytes are available (or the header ends)."""
+        while len(self._buffer) < size and not self._decompressor.eof:
+            chunk = self._decompressor.unconsumed_tail
+            if not chunk and self._source < self._end:
+                cur = self._data.tell()
+                self._data.seek(self._source)
+                chunk = self._data.read(min(INFLATE_CHUNK_SIZE, self._end - self._source))
+                self._data.seek(cur)
+                self._source += len(chunk)
+            if not chunk:
+                self._buffer += self._decompressor.flush()
+                break
+            # Bound the output too, since a small chunk can inflate to a lot.
+            limit = 0 if size == float('inf') else max(size - len(self._buffer), INFLATE_CHUNK_SIZE)
+            self._buffer += self._decompressor.decompress(chunk, limit)
+
+    def getvalue(self):
+        """Get the whole decompressed header."""
+        self._fill(float('inf'))
+        if len(self._value) != len(self._buffer):
+            self._value = bytes(self._buffer)
+        return self._value
+
+    def inflated(self):
+        """Number of bytes decompressed so far."""
+        return len(self._buffer)
+
+    def read(self, size=-1):
+        """Read bytes."""
+        if size is None or size < 0:
+            self._fill(float('inf'))
+            size = len(self._buffer) - self._pos
+        else:
+            self._fill(self._pos + size)
+        out = bytes(self._buffer[self._pos:self._pos + size])
+        self._pos += len(out)
+        return out
+
+    def seek(self, offset, whence=0):
+        """Change position."""
+        if whence == 1:
+            offset += self._pos
+        elif whence == 2:
+            self._fill(float('inf'))
+            offset += len(self._buffer)
+        self._pos = offset
+        return self._pos
+
+    def tell(self):
+        """Get position."""
+        return self._pos
+
+
+def inflate(data):
+    """Decompress header bytes on demand.
+
+    Like `decompress`, but returns an `Inflater`.
+    """
+    prefix_size = 8
+    start = data.tell()
+    header_len, _ = unpack('<II', data)
+    data.seek(start + header_len)
+    return Inflater(data, start + prefix_size, start + header_len)
+
+
 def parse_version(header, data):
     """Parse and compute game version."""
     log = unpack('<I', data)
@@ -678,23 +838,21 @@ def parse_version(header, data):
     return version, game.decode('ascii'), round(save, 2), log
 
 
-def parse_players(header, num_players, version, save):
+def parse_players(header, num_players, version, save, objects_filter=None):
     """Parse all players."""
     cur = header.tell()
     gaia = b'Gaia' if version in (Version.DE, Version.HD) else b'GAIA'
-    anchor = header.read().find(b'\x05\x00' + gaia + b'\x00')
+    anchor = find(header, b'\x05\x00' + gaia + b'\x00')
     rev = 43
     if save >= 61.5:
         rev = 7 + (num_players * 4)
     header.seek(cur + anchor - num_players - rev)
     mod = parse_mod(header, num_players, version)
-    players = [parse_player(header, number, num_players, save) for number in range(num_players)]
-    cur = header.tell()
+    players = [parse_player(header, number, num_players, save, objects_filter) for number in range(num_players)]
     pv = b'\x00\x00\x00@'
     if save >= 61.5:
         pv = b'\x66\x66\x06\x40'
-    points_version = header.read().find(pv)
-    header.seek(cur)
+    points_version = find(header, pv)
     header.read(points_version)
     for _ in range(num_players):
         version = unpack('<f', header)
@@ -713,15 +871,11 @@ def parse_metadata(header, save, skip_ai=True):
         if not skip_ai:
             raise RuntimeError("don't know how to parse ai")
 
-        offset = header.tell()
-        data = header.read()
         # Jump to the end of ai data
-        ai_end = re.search(
-            b'\00' * 4096,
-            data)
+        ai_end = AI_END_SEARCH.search(header.getvalue(), header.tell())
         if not ai_end:
             raise RuntimeError("could not find ai end")
-        header.seek(offset + ai_end.end())
+        header.seek(ai_end.end())
 
     game_speed, owner_id, num_players, cheats = unpack('<24xf17xhbxb', header)
 
@@ -737,20 +891,52 @@ def parse_metadata(header, save, skip_ai=True):
     ), num_players
 
 
-def parse(data):
-    """Parse recorded game header."""
+def parse(data, sections=None, objects=None):
+    """Parse recorded game header.
+
+    If `sections` (names from `SECTIONS`) is given, the header is
+    decompressed and parsed only up to the last requested section.
+    Sections after it are `None`.
+
+    If `objects` (a predicate taking player number, class id and
+    object id, see `object_filter`) is given, only matching objects
+    are included in `players`.
+    """
+    try:
+        header = decompress(data) if sections is None else inflate(data)
+    except (struct.error, zlib.error, MemoryError) as e:
+        raise RuntimeError(f"could not parse: {e}")
+    return parse_decompressed(header, data, sections, objects)
+
+
+def parse_decompressed(header, data, sections=None, objects=None):
+    """Parse decompressed recorded game header.
+
+    `data` must be positioned at the log version.
+    """
+    stop = len(SECTIONS)
+    if sections is not None:
+        stop = max([SECTIONS.index(section) + 1 for section in sections], default=0)
+    de = hd = metadata = map_ = players = mod = device = scenario = lobby = None
     try:
-        header = decompress(data)
         version, game, save, log = parse_version(header, data)
         if version not in (Version.USERPATCH15, Version.DE, Version.HD):
             raise RuntimeError(f"{version} not supported")
-        de = parse_de(header, version, save)
-        hd = parse_hd(header, version, save)
-        metadata, num_players = parse_metadata(header, save)
-        map_ = parse_map(header, version, save)
-        players, mod, device = parse_players(header, num_players, version, save)
-        scenario = parse_scenario(header, num_players, version, save)
-        lobby = parse_lobby(header, version, save)
+        # Sections are in header order; each must be parsed to reach the next.
+        if stop > 0:
+            de = parse_de(header, version, save)
+        if stop > 1:
+            hd = parse_hd(header, version, save)
+        if stop > 2:
+            metadata, num_players = parse_metadata(header, save)
+        if stop > 3:
+            map_ = parse_map(header, version, save)
+        if stop > 4:
+            players, mod, device = parse_players(header, num_players, version, save, objects)
+        if stop > 5:
+            scenario = parse_scenario(header, num_players, version, save)
+        if stop > 6:
+            lobby = parse_lobby(header, version, save)
     except (struct.error, zlib.error, AssertionError, MemoryError, ValueError) as e:
         raise RuntimeError(f"could not parse: {e}")
     return dict(
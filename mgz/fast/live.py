@@ -0,0 +1,70 @@
+"""Follow a rec that is still being written.
+
+Builds on the buffer parser in `mgz.fast.body`. Bytes are read as the
+file grows and each operation is decoded exactly once. A truncated
+trailing operation is not an error: it is left in place until more
+bytes arrive.
+"""
+import struct
+
+from mgz.fast import Operation
+from mgz.fast import body
+from mgz.fast.tail import DE_POSTGAME_MAGIC
+
+
+HEADER_LENGTH = struct.Struct('<I')
+LOG_VERSION_SIZE = 4
+
+
+class Follower:
+    """Resumable body parser for an in-progress rec.
+
+    Keeps the file contents read so far, the offset of the next
+    operation and the game time reached.
+    """
+
+    def __init__(self, handle):
+        """Initialize."""
+        self._handle = handle
+        self._data = bytearray()
+        self.position = None
+        self.timestamp = 0
+
+    def _read(self):
+        """Read bytes appended since the last call."""
+        self._handle.seek(len(self._data))
+        self._data += self._handle.read()
+
+    def _start(self, data):
+        """Offset of the first operation, or `None` if not written yet."""
+        try:
+            header_length, = HEADER_LENGTH.unpack_from(data)
+            return body.meta(data, header_length + LOG_VERSION_SIZE)
+        except (struct.error, ValueError):
+            return None
+
+    def poll(self):
+        """Get operations completed since the last call."""
+        self._read()
+        out = []
+        with memoryview(self._data) as data:
+            if self.position is None:
+                self.position = self._start(data)
+                if self.position is None:
+                    return out
+            pos = self.position
+            while True:
+                try:
+                    op_id, _, _, end = body.boundary(data, pos)
+                    if op_id == Operation.POSTGAME.value and data[-len(DE_POSTGAME_MAGIC):] != DE_POSTGAME_MAGIC:
+                        # Postgame runs to the end of the file; wait until it is complete.
+                        break
+                    op, _ = body.operation(data, pos)
+                except EOFError:
+                    break
+                if op[0] is Operation.SYNC:
+                    self.timestamp += op[1][0]
+                out.append(op)
+                pos = end
+            self.position = pos
+        return out
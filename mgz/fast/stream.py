@@ -0,0 +1,190 @@
+"""Incremental parsing of recs received in chunks.
+
+The header is decompressed with `zlib.decompressobj` while it
+arrives, and body operations are decoded as soon as they are
+complete. Only the unconsumed tail of the input is buffered.
+"""
+import asyncio
+import concurrent.futures
+import io
+import struct
+import zlib
+
+from mgz.fast import Action, Operation
+from mgz.fast import body
+from mgz.fast.header import ZLIB_WBITS, parse_decompressed
+
+
+PREFIX = struct.Struct('<II')
+LOG_VERSION_SIZE = 4
+CHUNK_SIZE = 64 * 1024
+
+
+class PushParser:
+    """Push parser fed with byte chunks.
+
+    `header` is set once the header has been parsed. Each call to
+    `feed` returns the body operations completed by the chunk.
+    """
+
+    def __init__(self):
+        """Initialize."""
+        self.header = None
+        self._buffer = bytearray()
+        self._offset = 0 # absolute offset of the buffer
+        self._header_length = None
+        self._decompressor = zlib.decompressobj(wbits=ZLIB_WBITS)
+        self._decompressed = []
+        self._started = False
+        self._skip = 0
+        self._closed = False
+
+    def feed(self, chunk):
+        """Add bytes and get completed operations."""
+        self._buffer += chunk
+        if self._header_length is None or self._offset < self._header_length:
+            self._feed_header()
+        if self.header is None:
+            self._parse_header()
+        if not self._started:
+            self._parse_meta()
+        if not self._started:
+            return []
+        return self._parse_operations()
+
+    def close(self):
+        """Signal end of input and get remaining operations.
+
+        Operations that run to the end of the file (postgame) are
+        only decoded here.
+        """
+        self._closed = True
+        operations = self.feed(b'')
+        if not self._started:
+            raise RuntimeError("could not parse: incomplete header")
+        return operations
+
+    def _consume(self, length):
+        """Drop bytes from the front of the buffer."""
+        del self._buffer[:length]
+        self._offset += length
+
+    def _feed_header(self):
+        """Decompress header bytes as they arrive."""
+        if self._header_length is None:
+            if len(self._buffer) < PREFIX.size:
+                return
+            self._header_length, _ = PREFIX.unpack_from(self._buffer)
+            self._consume(PREFIX.size)
+        length = min(len(self._buffer), self._header_length - self._offset)
+        try:
+            self._decompressed.append(self._decompressor.decompress(bytes(self._buffer[:length])))
+        except zlib.error as e:
+            raise RuntimeError(f"could not parse: {e}")
+        self._consume(length)
+
+    def _parse_header(self):
+        """Parse the header once it and the log version have arrived."""
+        if self._header_length is None or self._offset < self._header_length or len(self._buffer) < LOG_VERSION_SIZE:
+            return
+        self._decompressed.append(self._decompressor.flush())
+        header = io.BytesIO(b''.join(self._decompressed))
+        self._decompressed = None
+        self._decompressor = None
+        self.header = parse_decompressed(header, io.BytesIO(self._buffer[:LOG_VERSION_SIZE]))
+        self._consume(LOG_VERSION_SIZE)
+
+    def _parse_meta(self):
+        """Find the first operation."""
+        if self.header is None:
+            return
+        try:
+            pos = body.meta(self._buffer)
+        except ValueError:
+            return
+        self._consume(pos)
+        self._started = True
+
+    def _parse_operations(self):
+        """Decode complete operations in the buffer."""
+        out = []
+        pos = 0
+        with memoryview(self._buffer) as data:
+            size = len(data)
+            while True:
+                if self._skip:
+                    skipped = min(self._skip, size - pos)
+                    self._skip -= skipped
+                    pos += skipped
+                    if self._skip:
+                        break
+                if size - pos < 4:
+                    break
+                op_id, = body.UINT.unpack_from(data, pos)
+                if op_id not in body.OPERATIONS:
+                    # Saved chapter: the identifier is the absolute offset of the next operation.
+                    if size - pos < 8:
+                        break
+                    end = op_id
+                    if end < self._offset + pos + 8:
+                        end = float('inf')
+                    self._skip = end - self._offset - pos
+                    out.append((Operation.SAVE, None))
+                    continue
+                if not self._closed and self._runs_to_end(data, pos, op_id):
+                    break
+                try:
+                    end = body.boundary(data, pos)[3]
+                    op, _ = body.operation(data, pos)
+                except EOFError:
+                    break
+                out.append(op)
+                pos = end
+        self._consume(pos)
+        return out
+
+    def _runs_to_end(self, data, pos, op_id):
+        """Check if an operation runs to the end of the file."""
+        if op_id == Operation.POSTGAME.value:
+            return True
+        if op_id == Operation.ACTION.value and len(data) - pos >= body.ACTION_HEADER.size + 4:
+            return body.ACTION_HEADER.unpack_from(data, pos + 4)[1] == Action.POSTGAME.value
+        return False
+
+
+async def chunks(source, chunk_size=CHUNK_SIZE):
+    """Iterate over chunks of an async byte source.
+
+    `source` is an `asyncio.StreamReader` (or anything with an async
+    `read(n)`), or an async iterable of bytes.
+    """
+    if hasattr(source, 'read'):
+        while True:
+            chunk = await source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        async for chunk in source:
+            yield chunk
+
+
+async def operations(source, parser=None, chunk_size=CHUNK_SIZE, executor=None):
+    """Iterate over operations of a rec read from an async byte source.
+
+    Decoding runs in `executor` (the loop's default executor if not
+    given) so the event loop is not blocked. The parser is stateful,
+    so `executor` must be a thread executor; a process pool would
+    decode copies of it. Pass a `PushParser` as `parser` to access the
+    header, and do not share it between concurrent calls.
+    """
+    if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+        raise ValueError("executor must be a thread executor")
+    loop = asyncio.get_running_loop()
+    if parser is None:
+        parser = PushParser()
+    async for chunk in chunks(source, chunk_size):
+        for operation in await loop.run_in_executor(executor, parser.feed, chunk):
+            yield operation
+    for operation in await loop.run_in_executor(executor, parser.close):
+        yield operation
@@ -0,0 +1,76 @@
+"""Metadata from the end of a recorded game.
+
+DE recs end with postgame blocks (world time and leaderboards),
+and UserPatch recs end with the achievements postgame action, so
+both can be read without walking the body.
+"""
+import io
+import struct
+
+import mgz.body
+from mgz.fast import Postgame, postgame_block
+from mgz.util import find_postgame, SEARCH_MAX_BYTES
+
+
+DE_POSTGAME_MAGIC = bytes.fromhex('cea459b105db7b43')
+DE_POSTGAME_TRAILER = struct.Struct('<II8s')
+DE_POSTGAME_BLOCK = struct.Struct('<II')
+UP_POSTGAME_SEQUENCE = 4
+
+
+def de_postgame(handle):
+    """Parse DE postgame blocks, reading backwards from the end.
+
+    Returns `None` if the rec has no DE postgame.
+    """
+    pos = handle.seek(0, 2) - DE_POSTGAME_TRAILER.size
+    if pos < 0:
+        return None
+    handle.seek(pos)
+    num_blocks, _, magic = DE_POSTGAME_TRAILER.unpack(handle.read(DE_POSTGAME_TRAILER.size))
+    if magic != DE_POSTGAME_MAGIC:
+        return None
+    out = {}
+    for _ in range(num_blocks):
+        pos -= DE_POSTGAME_BLOCK.size
+        if pos < 0:
+            raise RuntimeError("invalid postgame")
+        handle.seek(pos)
+        length, identifier = DE_POSTGAME_BLOCK.unpack(handle.read(DE_POSTGAME_BLOCK.size))
+        pos -= length
+        if pos < 0:
+            raise RuntimeError("invalid postgame")
+        handle.seek(pos)
+        key, value = postgame_block(Postgame(identifier), io.BytesIO(handle.read(length)))
+        out[key] = value
+    return out
+
+
+def up_postgame(handle):
+    """Parse UserPatch achievements postgame near the end.
+
+    Returns `None` if the rec has no UserPatch postgame.
+    """
+    size = handle.seek(0, 2)
+    handle.seek(max(size - SEARCH_MAX_BYTES, 0))
+    # Pad short files so the search window never starts before the data.
+    data = bytes(max(SEARCH_MAX_BYTES - size, 0)) + handle.read()
+    pos, length = find_postgame(data, len(data))
+    if pos is None:
+        return None
+    end = pos + length - 1
+    return mgz.body.actions.postgame.parse(data[pos:end] + data[end + UP_POSTGAME_SEQUENCE:])
+
+
+def parse(handle):
+    """Parse metadata at the end of a rec.
+
+    Returns world time (milliseconds), leaderboards and the UserPatch
+    postgame, each `None` if not present.
+    """
+    de = de_postgame(handle) or {}
+    return dict(
+        world_time=de.get('world_time'),
+        leaderboards=de.get('leaderboards'),
+        postgame=up_postgame(handle) if not de else None
+    )
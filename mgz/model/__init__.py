@@ -10,11 +10,14 @@ from enum import Enum
 import dataclasses
 
 from mgz import fast
+import mgz.fast.body
 from mgz.reference import get_consts, get_dataset
 from mgz.fast import Action as ActionEnum
 from mgz.fast.header import parse
 from mgz.model.definitions import *
+from mgz.model.columns import ActionColumns
 from mgz.model.inputs import Inputs
+from mgz.model.tiles import TileGrid
 from mgz.common.chat import parse_chat, Chat as ChatEnum
 from mgz.common.diplomacy import get_diplomacy_type
 from mgz.common.map import get_map_data
@@ -26,28 +29,32 @@ AI_ACTIONS = [ActionEnum.AI_ORDER]
 
 
 def enrich_action(action, action_data, dataset, consts):
-    """Enrich action data with lookups."""
+    """Enrich action data with lookups.
+
+    `dataset` and `consts` are indexed reference data (see
+    `mgz.reference`).
+    """
     if 'x' in action_data and 'y' in action_data and action_data['x'] >=0 and action_data['y'] >= 0:
         if action.type != fast.Action.SPECIAL or ('target_id' in action_data and action_data['target_id'] > 0):
             action.position = Position(action_data['x'], action_data['y'])
             del action.payload['x']
             del action.payload['y']
     if 'technology_id' in action_data:
-        action.payload['technology'] = dataset['technologies'].get(str(action_data['technology_id']))
+        action.payload['technology'] = dataset['technologies'].get(action_data['technology_id'])
     if 'formation_id' in action_data:
-        action.payload['formation'] = consts['formations'].get(str(action_data['formation_id']))
+        action.payload['formation'] = consts['formations'].get(action_data['formation_id'])
     if 'stance_id' in action_data:
-        action.payload['stance'] = consts['stances'].get(str(action_data['stance_id']))
+        action.payload['stance'] = consts['stances'].get(action_data['stance_id'])
     if 'building_id' in action_data:
-        action.payload['building'] = dataset['objects'].get(str(action_data['building_id']))
+        action.payload['building'] = dataset['objects'].get(action_data['building_id'])
     if 'unit_id' in action_data:
-        action.payload['unit'] = dataset['objects'].get(str(action_data['unit_id']))
+        action.payload['unit'] = dataset['objects'].get(action_data['unit_id'])
     if 'command_id' in action_data:
-        action.payload['command'] = consts['commands'].get(str(action_data['command_id']))
+        action.payload['command'] = consts['commands'].get(action_data['command_id'])
     if 'order_id' in action_data:
-        action.payload['order'] = consts['orders'].get(str(action_data['order_id']))
+        action.payload['order'] = consts['orders'].get(action_data['order_id'])
     if 'resource_id' in action_data:
-        action.payload['resource'] = consts['resources'].get(str(action_data['resource_id']))
+        action.payload['resource'] = consts['resources'].get(action_data['resource_id'])
 
 
 def get_difficulty(data):
@@ -95,18 +102,49 @@ def get_hash(data):
     return None
 
 
-def parse_match(handle):
+def parse_match(handle, action_types=None, columnar=False, header_only=False, max_time=None, max_operations=None,
+                resume=None, checkpoint=False, objects=None):
     """Parse a match.
 
     This is one big function because the dependency graph between
     the variables is dense.
+
+    If `action_types` (a set of `mgz.fast.Action`) is given, only
+    those actions become `Action` and `Input` objects. For other
+    actions, only the player is read (resignations are decoded) to
+    count toward eAPM and resignations. Unlike unfiltered parsing,
+    eAPM then also counts actions whose payload would not decode.
+
+    If `columnar` is set, `actions` is an `ActionColumns` instead of a
+    list of `Action`, and actions are not refined into inputs. Object
+    IDs of repeated selections are filled in as for `Action` payloads.
+
+    If `header_only` is set, the body is never read. Fields derived
+    from the body (actions, viewlocks, uptimes, duration, winners,
+    eAPM, file hash, ...) are left as `None`.
+
+    If `max_time` (a `timedelta` of game time, on the same clock as
+    action timestamps) or `max_operations` is given, body processing
+    stops once either is reached and the match is marked `truncated`.
+    Winners are then unknown (`None`), and eAPM is computed over the
+    game time processed up to the cutoff.
+
+    If `checkpoint` is set, the body parsing state where processing
+    stopped is recorded as `Match.checkpoint`. Passing a `Checkpoint`
+    as `resume` continues from it: body-derived lists only hold what
+    follows the checkpoint, while timing, eAPM and winners carry over.
+    A checkpoint taken from a different file raises `ValueError`.
+
+    If `objects` (see `mgz.fast.header.object_filter`) is given, only
+    matching header objects become `Object`s. Player positions come
+    from town centers, so they are `None` if those are filtered out.
     """
 
-    data = parse(handle)
+    data = parse(handle, objects=objects)
     body_pos = handle.tell() - 4 # log version
-    consts = get_consts()
+    consts = get_consts(indexed=True)
 
-    dataset_id, dataset = get_dataset(data['version'], data['mod'])
+    dataset_id, dataset = get_dataset(data['version'], data['mod'], indexed=True)
     map_id = get_map_id(data)
     try:
             map_data, encoding, language = get_map_data(
@@ -117,7 +155,8 @@ def parse_match(handle):
             dataset_id,
             dataset,
             data['map']['tiles'],
-            de_seed=data['lobby']['seed']
+            de_seed=data['lobby']['seed'],
+            tile_dicts=False
         )
     except ValueError as e:
         raise RuntimeError(f"could not get map data: {e}")
@@ -137,7 +176,7 @@ def parse_match(handle):
     # Parse gaia objects
     gaia = [
         Object(
-            dataset['objects'].get(str(obj['object_id'])),
+            dataset['objects'].get(obj['object_id']),
             obj['class_id'],
             obj['object_id'],
             obj['instance_id'],
@@ -169,14 +208,14 @@ def parse_match(handle):
         players[player['number']] = Player(
             player['number'],
             player['name'].decode(encoding),
-            consts['player_colors'][str(player['color_id'])],
+            consts['player_colors'][player['color_id']],
             player['color_id'],
-            dataset['civilizations'][str(player['civilization_id'])]['name'],
+            dataset['civilizations'][player['civilization_id']]['name'],
             player['civilization_id'],
             Position(pos_x, pos_y),
             [
                 Object(
-                    dataset['objects'].get(str(obj['object_id'])),
+                    dataset['objects'].get(obj['object_id']),
                     obj['class_id'],
                     obj['object_id'],
                     obj['instance_id'],
@@ -230,74 +269,135 @@ def parse_match(handle):
         inputs.add_chat(chats[-1])
 
     # Parse player actions
-    fast.meta(handle)
+    if header_only:
+        file_size = handle.seek(0, 2) + 4 # same as a full parse
+        rec = None
+        operations = []
+    else:
+        handle.seek(0)
+        rec = memoryview(handle.read())
+        header_hash = hashlib.sha1(rec[:body_pos]).hexdigest()
+        if resume and (resume.header_hash != header_hash or resume.position > len(rec)):
+            raise ValueError("checkpoint does not match this file")
+        body_start = resume.position if resume else fast.body.meta(rec, body_pos + 4)
+        operations = fast.body.operations(rec, body_start, lazy=action_types is not None)
     timestamp = 0
     resigned = []
-    actions = []
+    actions = ActionColumns() if columnar else []
     viewlocks = []
     uptimes = []
     eapm = collections.Counter()
     last_viewlock = None
-    while True:
-        try:
-            op_type, op_data = fast.operation(handle)
-            if op_type is fast.Operation.SYNC:
-                timestamp += op_data[0]
-                if op_data[2]:
-                    stat_row = op_data[2]
-                    for player in players.values():
-                        if player.number not in stat_row:
-                            continue
-                        stats = stat_row[player.number]
-                        player.timeseries.append(TimeseriesRow(
-                            timestamp=timedelta(milliseconds=stat_row['current_time']),
-                            total_resources=stats['total_res'],
-                            total_objects=stats['obj_count']
-                        ))
-            elif op_type is fast.Operation.VIEWLOCK:
-                if op_data == last_viewlock:
-                    continue
-                viewlock = Viewlock(timedelta(milliseconds=timestamp), Position(*op_data), players[data['metadata']['owner_id']])
-                viewlocks.append(viewlock)
-                last_viewlock = op_data
-            elif op_type is fast.Operation.CHAT:
-                chat = parse_chat(op_data, encoding, timestamp, pd, diplomacy_type, 'game')
-                if chat['type'] == ChatEnum.MESSAGE:
-                    chats.append(Chat(
-                        timedelta(milliseconds=chat['timestamp'] + data['map']['restore_time']),
-                        chat['message'],
-                        chat['origination'],
-                        chat['audience'],
-                        players[chat['player_number']]
+    if resume:
+        timestamp = resume.timestamp
+        resigned = [players[number] for number in resume.resigned]
+        eapm.update(resume.eapm)
+        last_viewlock = resume.last_viewlock
+        inputs.set_state(resume.buildings, resume.object_ids)
+    max_timestamp = max_time.total_seconds() * 1000 if max_time is not None else None
+    truncated = False
+    processed = -1
+    for processed, (op_type, op_data) in enumerate(operations):
+        if max_operations is not None and processed >= max_operations:
+            truncated = True
+            break
+        if op_type is fast.Operation.SYNC:
+            if max_timestamp is not None and timestamp + op_data[0] > max_timestamp:
+                truncated = True
+                break
+            timestamp += op_data[0]
+            if op_data[2]:
+                stat_row = op_data[2]
+                for player in players.values():
+                    if player.number not in stat_row:
+                        continue
+                    stats = stat_row[player.number]
+                    player.timeseries.append(TimeseriesRow(
+                        timestamp=timedelta(milliseconds=stat_row['current_time']),
+                        total_resources=stats['total_res'],
+                        total_objects=stats['obj_count']
                     ))
-                    inputs.add_chat(chats[-1])
-                if chat['type'] == ChatEnum.AGE:
-                    uptimes.append(
-                        Uptime(
-                            timedelta(milliseconds=chat['timestamp'] + data['map']['restore_time']),
-                            chat['age'],
-                            players.get(chat['player_number']),
-                        )
+        elif op_type is fast.Operation.VIEWLOCK:
+            if op_data == last_viewlock:
+                continue
+            viewlock = Viewlock(timedelta(milliseconds=timestamp), Position(*op_data), players[data['metadata']['owner_id']])
+            viewlocks.append(viewlock)
+            last_viewlock = op_data
+        elif op_type is fast.Operation.CHAT:
+            chat = parse_chat(op_data, encoding, timestamp, pd, diplomacy_type, 'game')
+            if chat['type'] == ChatEnum.MESSAGE:
+                chats.append(Chat(
+                    timedelta(milliseconds=chat['timestamp'] + data['map']['restore_time']),
+                    chat['message'],
+                    chat['origination'],
+                    chat['audience'],
+                    players[chat['player_number']]
+                ))
+                inputs.add_chat(chats[-1])
+            if chat['type'] == ChatEnum.AGE:
+                uptimes.append(
+                    Uptime(
+                        timedelta(milliseconds=chat['timestamp'] + data['map']['restore_time']),
+                        chat['age'],
+                        players.get(chat['player_number']),
                     )
-            elif op_type is fast.Operation.ACTION:
-                action_type, action_data = op_data
-                action = Action(timedelta(milliseconds=timestamp), action_type, action_data)
-                if action_type is fast.Action.RESIGN and action_data['player_id'] in players:
-                    resigned.append(players[action_data['player_id']])
-                if 'player_id' in action_data and action_data['player_id'] in players:
+                )
+        elif op_type is fast.Operation.ACTION:
+            action_type, action_data = op_data
+            if isinstance(action_data, fast.LazyAction):
+                if action_type not in action_types:
+                    if action_type is fast.Action.RESIGN:
+                        action_type, action_data = action_data.decode()
+                        player_id = action_data.get('player_id')
+                    else:
+                        player_id = action_data.player_id
+                    if player_id in players:
+                        if action_type is fast.Action.RESIGN:
+                            resigned.append(players[player_id])
+                        if action_type not in AI_ACTIONS:
+                            eapm[player_id] += 1
+                    continue
+                action_type, action_data = action_data.decode()
+            if columnar:
+                player_id = action_data.get('player_id')
+                if player_id in players:
+                    if action_type is fast.Action.RESIGN:
+                        resigned.append(players[player_id])
                     if action_type not in AI_ACTIONS:
-                        eapm[action_data['player_id']] += 1
-                    action.player = players[action_data['player_id']]
-                    del action.payload['player_id']
-                enrich_action(action, action_data, dataset, consts)
-                actions.append(action)
-                inputs.add_action(action)
-            elif op_type is fast.Operation.POSTGAME and "leaderboards" in op_data:
-                by_number = {x["number"]: x["rating"] for x in op_data["leaderboards"][0]["players"]}
-                for player in players.values():
-                    player.rate_snapshot = by_number.get(player.number - 1)
-        except EOFError:
-            break
+                        eapm[player_id] += 1
+                inputs.fill_object_ids(action_type, action_data)
+                actions.append(timestamp, action_type, action_data)
+                continue
+            action = Action(timedelta(milliseconds=timestamp), action_type, action_data)
+            if action_type is fast.Action.RESIGN and action_data['player_id'] in players:
+                resigned.append(players[action_data['player_id']])
+            if 'player_id' in action_data and action_data['player_id'] in players:
+                if action_type not in AI_ACTIONS:
+                    eapm[action_data['player_id']] += 1
+                action.player = players[action_data['player_id']]
+                del action.payload['player_id']
+            enrich_action(action, action_data, dataset, consts)
+            actions.append(action)
+            inputs.add_action(action)
+        elif op_type is fast.Operation.POSTGAME and "leaderboards" in op_data:
+            by_number = {x["number"]: x["rating"] for x in op_data["leaderboards"][0]["players"]}
+            for player in players.values():
+                player.rate_snapshot = by_number.get(player.number - 1)
+    else:
+        processed += 1
+
+    # Record state for resuming
+    match_checkpoint = None
+    if checkpoint and not header_only:
+        match_checkpoint = Checkpoint(
+            fast.body.skip(rec, body_start, processed),
+            timestamp,
+            last_viewlock,
+            dict(eapm),
+            [player.number for player in resigned],
+            *inputs.get_state(),
+            header_hash
+        )
 
     # Compute winner(s)
     for team in teams:
@@ -310,10 +410,18 @@ def parse_match(handle):
     for player_id, action_count in eapm.items():
         players[player_id].eapm = int(round(eapm[player_id] / ((timestamp/1000)/60)))
 
-    handle.seek(body_pos)
-    file_bytes = handle.read()
-    file_size = body_pos + 4 + len(file_bytes)
-    file_hash = hashlib.sha1(file_bytes).hexdigest()
+    if header_only or truncated:
+        for player in players.values():
+            player.winner = None
+    if header_only:
+        file_hash = None
+        actions = viewlocks = uptimes = None
+        duration = None
+    else:
+        file_bytes = rec[body_pos:]
+        file_size = body_pos + 4 + len(file_bytes)
+        file_hash = hashlib.sha1(file_bytes).hexdigest()
+        duration = timedelta(milliseconds=timestamp + data['map']['restore_time'])
     return Match(
         list(players.values()),
         teams,
@@ -322,19 +430,13 @@ def parse_match(handle):
             map_id,
             map_data['name'],
             map_data['dimension'],
-            consts['map_sizes'].get(str(map_data['dimension'])),
+            consts['map_sizes'].get(map_data['dimension']),
             map_data['custom'],
             map_data['seed'],
             data['de']['rms_mod_id'] if data['version'] is Version.DE and map_data['custom'] else None,
             map_data['name'].startswith('ZR@'),
             map_data['modes'],
-            [
-                Tile(
-                    tile['terrain_id'],
-                    tile['elevation'],
-                    Position(tile['x'], tile['y'])
-                ) for tile in map_data['tiles']
-            ]
+            TileGrid(map_data['dimension'], data['map']['terrain'], data['map']['elevation'])
         ),
         File(
             codecs.lookup(encoding),
@@ -347,7 +449,7 @@ def parse_match(handle):
         ),
         data['map']['restore_time'] > 0,
         timedelta(milliseconds=data['map']['restore_time']),
-        consts['speeds'][str(int(round(data['metadata']['speed'], 2) * 100))],
+        consts['speeds'][int(round(data['metadata']['speed'], 2) * 100)],
         int(round(data['metadata']['speed'], 2) * 100),
         data['metadata']['cheats'],
         data['lobby']['lock_teams'],
@@ -357,21 +459,21 @@ def parse_match(handle):
         lobby,
         rated,
         dataset['dataset']['name'],
-        consts['game_types'][str(data['lobby']['game_type_id'])],
+        consts['game_types'][data['lobby']['game_type_id']],
         data['lobby']['game_type_id'],
-        consts['map_reveal_choices'][str(data['lobby']['reveal_map_id'])],
+        consts['map_reveal_choices'][data['lobby']['reveal_map_id']],
         data['lobby']['reveal_map_id'],
-        consts['difficulties'].get(str(get_difficulty(data))),
+        consts['difficulties'].get(get_difficulty(data)),
         get_difficulty(data),
-        consts['starting_ages'].get(str(get_starting_age(data))),
+        consts['starting_ages'].get(get_starting_age(data)),
         get_starting_age(data),
         get_team_together(data),
         get_lock_speed(data),
         get_all_technologies(data),
         True if data['version'] is Version.DE else None,
-        timedelta(milliseconds=timestamp + data['map']['restore_time']),
+        duration,
         diplomacy_type,
-        bool(resigned),
+        bool(resigned) if not header_only else None,
         dataset_id,
         data['version'],
         data['game_version'],
@@ -386,7 +488,9 @@ def parse_match(handle):
         get_hash(data),
         actions,
         inputs.inputs,
-        uptimes
+        uptimes,
+        truncated,
+        match_checkpoint
     )
 
 
@@ -404,7 +508,7 @@ def serialize(obj):
             if obj in seen:
                 return hash(obj)
             seen.add(obj)
-        if type(obj) is list:
+        if type(obj) is list or isinstance(obj, TileGrid):
             return [v for v in [impl(o) for o in obj] if v is not None]
         elif type(obj) is dict:
             return {k:v for k, v in {f:impl(d) for f, d in obj.items()}.items() if v is not None}
@@ -0,0 +1,67 @@
+"""Columnar action storage."""
+
+import array
+import math
+
+
+NAN = math.nan
+COLUMNS = ['timestamps', 'types', 'players', 'x', 'y', 'targets', 'object_id_offsets', 'object_ids']
+
+
+class ActionColumns:
+    """Actions stored in parallel arrays.
+
+    One entry per action:
+    - timestamps: game time in milliseconds
+    - types: action type value
+    - players: player number (-1 if not present)
+    - x, y: coordinates (NaN if not present)
+    - targets: target ID (-1 if not present)
+
+    Object IDs are stored CSR-style: the object IDs of action `i` are
+    `object_ids[object_id_offsets[i]:object_id_offsets[i + 1]]`.
+    """
+
+    def __init__(self):
+        """Initialize."""
+        self.timestamps = array.array('I')
+        self.types = array.array('h')
+        self.players = array.array('h')
+        self.x = array.array('f')
+        self.y = array.array('f')
+        self.targets = array.array('q')
+        self.object_id_offsets = array.array('Q', [0])
+        self.object_ids = array.array('I')
+
+    def __len__(self):
+        """Number of actions."""
+        return len(self.timestamps)
+
+    def append(self, timestamp, action_type, payload):
+        """Add an action."""
+        self.timestamps.append(timestamp)
+        self.types.append(action_type.value)
+        self.players.append(payload.get('player_id', -1))
+        self.x.append(payload.get('x', NAN))
+        self.y.append(payload.get('y', NAN))
+        self.targets.append(payload.get('target_id', -1))
+        ids = payload.get('object_ids')
+        if ids:
+            self.object_ids.extend([i & 0xFFFFFFFF for i in ids])
+        self.object_id_offsets.append(len(self.object_ids))
+
+    def get_object_ids(self, i):
+        """Get object IDs of the i-th action."""
+        return self.object_ids[self.object_id_offsets[i]:self.object_id_offsets[i + 1]]
+
+    def nbytes(self):
+        """Memory used by the columns, in bytes."""
+        return sum(len(c) * c.itemsize for c in (getattr(self, name) for name in COLUMNS))
+
+    def to_numpy(self):
+        """Get columns as NumPy arrays (without copying).
+
+        Requires `numpy`.
+        """
+        import numpy
+        return {name: numpy.frombuffer(getattr(self, name), dtype=getattr(self, name).typecode) for name in COLUMNS}
@@ -55,9 +55,10 @@ def empty_achievements():
 class ModelSummary:
     """Compatibility layer between Model and Summary classes."""
 
-    def __init__(self, handle):
-        self.match = parse_match(handle)
+    def __init__(self, handle, header_only=False, max_time=None, max_operations=None):
+        self.match = parse_match(handle, header_only=header_only, max_time=max_time, max_operations=max_operations)
         self.size = self.match.file.size
+        self._tiles = None
 
     def get_chat(self):
         return [dict(
@@ -138,11 +139,16 @@ class ModelSummary:
         return self.match.file.perspective.number
 
     def get_duration(self):
+        if self.match.duration is None:
+            return None
         return self.match.duration.total_seconds() * 1000
 
     def get_completed(self):
         return self.match.completed
 
+    def get_truncated(self):
+        return self.match.truncated
+
     def get_restored(self):
         return self.match.restored, self.match.restored_at.total_seconds() * 1000
 
@@ -268,12 +274,15 @@ class ModelSummary:
             modes=self.match.map.modes,
             zr=self.match.map.zr,
             water=None,
-            tiles=[
-                dict(
-                    x=t.position.x,
-                    y=t.position.y,
-                    elevation=t.elevation,
-                    terrain_id=t.terrain
-                ) for t in self.match.map.tiles
-            ]
+            tiles=self.get_tiles()
         )
+
+    def get_tiles(self):
+        """Get tiles as dicts, built once.
+
+        The list is shared by all callers (including `get_map`), so it
+        must not be mutated.
+        """
+        if self._tiles is None:
+            self._tiles = self.match.map.tiles.to_dicts()
+        return self._tiles
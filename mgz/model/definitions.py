@@ -1,5 +1,8 @@
 """Model class definitions."""
 
+import dataclasses
+import json
+import sys
 from dataclasses import dataclass
 from datetime import timedelta, datetime
 from mgz.fast import Action as ActionEnum
@@ -7,7 +10,12 @@ from mgz.fast import Age as AgeEnum
 from mgz.util import Version
 
 
-@dataclass
+# Classes created by the thousand per match have no instance `__dict__`
+# where supported (Python 3.10+).
+SLOTS = dict(slots=True) if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**SLOTS)
 class Position:
     """Represents a coordinate."""
 
@@ -18,7 +26,7 @@ class Position:
         return hash((self.x, self.y))
 
 
-@dataclass
+@dataclass(**SLOTS)
 class Object:
     """Represents an object."""
 
@@ -30,7 +38,7 @@ class Object:
     position: Position
 
 
-@dataclass
+@dataclass(**SLOTS)
 class TimeseriesRow:
     """Represents a timeseries row."""
 
@@ -68,7 +76,7 @@ class Player:
         return self.number
 
 
-@dataclass
+@dataclass(**SLOTS)
 class Action:
     """Represents an abstract action."""
 
@@ -79,7 +87,7 @@ class Action:
     position: Position = None
 
 
-@dataclass
+@dataclass(**SLOTS)
 class Input:
     """Represents a player input."""
 
@@ -91,7 +99,7 @@ class Input:
     position: Position = None
 
 
-@dataclass
+@dataclass(**SLOTS)
 class Viewlock:
     """Represents player view."""
 
@@ -100,7 +108,7 @@ class Viewlock:
     player: Player
 
 
-@dataclass
+@dataclass(**SLOTS)
 class Tile:
     """Represents a map tile."""
 
@@ -122,7 +130,17 @@ class Map:
     mod_id: int
     zr: bool
     modes: dict
-    tiles: list
+    tiles: 'TileGrid'
+
+    @property
+    def terrain(self):
+        """Row-major terrain grid."""
+        return self.tiles.terrain
+
+    @property
+    def elevation(self):
+        """Row-major elevation grid."""
+        return self.tiles.elevation
 
     def __repr__(self):
         return self.name
@@ -216,3 +234,38 @@ class Match:
     actions: list
     inputs: list
     uptimes: list
+    truncated: bool = False
+    checkpoint: 'Checkpoint' = None
+
+
+@dataclass
+class Checkpoint:
+    """Represents body parsing state, for resuming."""
+
+    position: int
+    timestamp: int
+    last_viewlock: tuple
+    eapm: dict
+    resigned: list
+    buildings: dict
+    object_ids: dict
+    header_hash: str = None
+
+    def dump(self, handle):
+        """Write as JSON."""
+        json.dump(dataclasses.asdict(self), handle)
+
+    @classmethod
+    def load(cls, handle):
+        """Read from JSON."""
+        data = json.load(handle)
+        return cls(
+            data['position'],
+            data['timestamp'],
+            tuple(data['last_viewlock']) if data['last_viewlock'] is not None else None,
+            {int(k): v for k, v in data['eapm'].items()},
+            data['resigned'],
+            {int(k): v for k, v in data['buildings'].items()},
+            data['object_ids'],
+            data.get('header_hash')
+        )
@@ -20,20 +20,35 @@ class Inputs:
         self._oid_cache = {}
         self.inputs = []
 
+    def get_state(self):
+        """Get building and object ID caches."""
+        return dict(self._buildings), {k.name: list(v) for k, v in self._oid_cache.items()}
+
+    def set_state(self, buildings, object_ids):
+        """Restore building and object ID caches."""
+        self._buildings = dict(buildings)
+        self._oid_cache = {ActionEnum[k]: list(v) for k, v in object_ids.items()}
+
     def add_chat(self, chat):
         """Add chat input."""
         self.inputs.append(Input(chat.timestamp, 'Chat', None, dict(message=chat.message), chat.player, None))
 
+    def fill_object_ids(self, action_type, payload):
+        """Fill in object IDs left out because the selection is unchanged."""
+        if action_type in (ActionEnum.DE_TRANSFORM, ActionEnum.POSTGAME):
+            return
+        if 'object_ids' in payload and payload['object_ids']:
+            self._oid_cache[action_type] = payload['object_ids']
+        elif action_type in self._oid_cache:
+            payload['object_ids'] = self._oid_cache[action_type]
+
     def add_action(self, action):
         """Add action input."""
         if action.type in (ActionEnum.DE_TRANSFORM, ActionEnum.POSTGAME):
             return
         name = ACTION_TRANSLATE.get(action.type, action.type.name).replace('_', ' ').title()
         param = None
-        if 'object_ids' in action.payload and action.payload['object_ids']:
-            self._oid_cache[action.type] = action.payload['object_ids']
-        elif action.type in self._oid_cache:
-            action.payload['object_ids'] = self._oid_cache[action.type]
+        self.fill_object_ids(action.type, action.payload)
         if action.type is ActionEnum.SPECIAL:
             name = action.payload['order']
         elif action.type is ActionEnum.GAME:
@@ -0,0 +1,72 @@
+"""Grid-backed map tiles."""
+
+from mgz.model.definitions import Position, Tile
+
+
+class TileGrid:
+    """Map tiles stored as terrain and elevation grids.
+
+    The grids are row-major and `dimension` tiles wide. Tiles are
+    indexed by position in the grid or by `(x, y)`. `Tile` objects
+    are only created when tiles are accessed.
+    """
+
+    def __init__(self, dimension, terrain, elevation):
+        """Initialize."""
+        self.dimension = dimension
+        self.terrain = terrain
+        self.elevation = elevation
+
+    def __eq__(self, other):
+        """Compare dimension and grids."""
+        if not isinstance(other, TileGrid):
+            return NotImplemented
+        return self.dimension == other.dimension and self.terrain == other.terrain and self.elevation == other.elevation
+
+    def __len__(self):
+        """Number of tiles."""
+        return len(self.terrain)
+
+    def __getitem__(self, i):
+        """Get the i-th tile, the tile at `(x, y)`, or a list of tiles for a slice."""
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if isinstance(i, tuple):
+            x, y = i
+            if not (0 <= x < self.dimension and 0 <= y < len(self) // self.dimension):
+                raise IndexError("tile position out of range")
+            i = y * self.dimension + x
+        elif i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("tile index out of range")
+        y, x = divmod(i, self.dimension)
+        return Tile(self.terrain[i], self.elevation[i], Position(x, y))
+
+    def __iter__(self):
+        """Iterate over tiles."""
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_dicts(self):
+        """Get tiles as a list of dicts, without creating `Tile` objects."""
+        return [
+            dict(x=i % self.dimension, y=i // self.dimension, terrain_id=terrain, elevation=elevation)
+            for i, (terrain, elevation) in enumerate(zip(self.terrain, self.elevation))
+        ]
+
+    def nbytes(self):
+        """Memory used by the grids, in bytes."""
+        return len(self.terrain) * self.terrain.itemsize + len(self.elevation) * self.elevation.itemsize
+
+    def to_numpy(self):
+        """Get grids as (y x x) NumPy arrays (without copying).
+
+        Requires `numpy`.
+        """
+        import numpy
+        shape = (len(self) // self.dimension, self.dimension)
+        return dict(
+            terrain=numpy.frombuffer(self.terrain, dtype=numpy.int8).reshape(shape),
+            elevation=numpy.frombuffer(self.elevation, dtype=numpy.int8).reshape(shape)
+        )
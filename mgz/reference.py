@@ -1,15 +1,72 @@
-"""Reference data helpers."""
+"""Reference data helpers.
 
+Reference data is read once per process. Call `load` before forking
+worker processes so they share it copy-on-write, and `clear_cache` to
+reload it (e.g. after upgrading `aocref`).
+
+By default, each call returns a new copy of the data as plain dicts
+and lists. Indexed reference data has tables keyed by int ids instead
+of strings, so lookups need no string conversion. It is decoded once
+and shared by all callers, so it is read-only (mapping proxies and
+tuples).
+"""
+
+import functools
 import json
 import pkgutil
+from types import MappingProxyType
 from mgz.util import Version
 
 
 REF_PACKAGE = 'aocref'
+DATASET_IDS = [0, 100, 101, 300]
+
+
+def _freeze(obj):
+    """Make decoded JSON read-only."""
+    if isinstance(obj, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(_freeze(v) for v in obj)
+    return obj
+
+
+@functools.lru_cache(maxsize=None)
+def _read(path):
+    """Read and cache raw reference data."""
+    return pkgutil.get_data(REF_PACKAGE, path)
+
+
+def _load_copy(path):
+    """Load a private copy of reference data."""
+    return json.loads(_read(path))
+
+
+@functools.lru_cache(maxsize=None)
+def _load(path):
+    """Load and cache read-only reference data."""
+    return _freeze(json.loads(_read(path)))
 
 
-def get_dataset(version, mod):
-    """Fetch dataset reference data."""
+def _int_keys(table):
+    """Key a table by int, if all of its keys are ids."""
+    try:
+        return MappingProxyType({int(k): v for k, v in table.items()})
+    except ValueError:
+        return table
+
+
+@functools.lru_cache(maxsize=None)
+def _load_indexed(path):
+    """Load and cache reference data with int-keyed tables."""
+    return MappingProxyType({name: _int_keys(table) for name, table in _load(path).items()})
+
+
+def get_dataset(version, mod, indexed=False):
+    """Fetch dataset reference data.
+
+    If `indexed` is set, tables are keyed by int and read-only.
+    """
     if version is Version.DE:
         if isinstance(mod, list) and 11 in mod:
             dataset_id = 101
@@ -21,9 +78,28 @@ def get_dataset(version, mod):
         dataset_id = mod[0]
     else:
         dataset_id = 0
-    return dataset_id, json.loads(pkgutil.get_data(REF_PACKAGE, f'data/datasets/{dataset_id}.json'))
+    load_ = _load_indexed if indexed else _load_copy
+    return dataset_id, load_(f'data/datasets/{dataset_id}.json')
+
+
+def get_consts(indexed=False):
+    """Fetch constants.
+
+    If `indexed` is set, tables are keyed by int and read-only.
+    """
+    load_ = _load_indexed if indexed else _load_copy
+    return load_('data/constants.json')
+
+
+def load(dataset_ids=DATASET_IDS):
+    """Pre-warm the cache with constants and datasets."""
+    _load_indexed('data/constants.json')
+    for dataset_id in dataset_ids:
+        _load_indexed(f'data/datasets/{dataset_id}.json')
 
 
-def get_consts():
-    """Fetch constants."""
-    return json.loads(pkgutil.get_data(REF_PACKAGE, f'data/constants.json'))
+def clear_cache():
+    """Drop cached reference data, so it is reloaded on next use."""
+    _read.cache_clear()
+    _load.cache_clear()
+    _load_indexed.cache_clear()
@@ -1,4 +1,4 @@
-from mgz.fast.header import decompress, parse_version
+from mgz.fast.header import inflate, parse_version
 from mgz.summary.full import FullSummary
 from mgz.model.compat import ModelSummary
 from mgz.util import Version
@@ -11,7 +11,7 @@ class SummaryStub:
 
     def __call__(self, data, fallback=False):
         try:
-            header = decompress(data)
+            header = inflate(data)
             version, game, save, log = parse_version(header, data)
             data.seek(0)
             supported = (version is Version.DE and save > 13.34) # or version is Version.USERPATCH15
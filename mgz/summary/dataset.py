@@ -22,14 +22,14 @@ def resolve_hd_version(hd, save_version):
 
 
 def get_dataset_data(header):
-    """Get dataset."""
+    """Get dataset and indexed reference data."""
     sample = header.initial.players[0].attributes.player_stats
     mod = None
     if header.de:
         mod = header.de.dlc_ids
     if 'mod' in sample:
         mod = (sample.mod.get('id'), sample.mod.get('version'))
-    _, ref = get_dataset(header.version, mod)
+    _, ref = get_dataset(header.version, mod, indexed=True)
     if header.version == Version.DE:
         if 11 in header.de.dlc_ids:
             return {
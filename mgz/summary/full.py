@@ -43,8 +43,12 @@ class FullSummary: # pylint: disable=too-many-public-methods
     Access match summary data.
     """
 
-    def __init__(self, handle):
-        """Initialize."""
+    def __init__(self, handle, max_time=None, max_operations=None):
+        """Initialize.
+
+        If `max_time` (a `timedelta` of game time) or `max_operations`
+        is given, body processing stops once either is reached.
+        """
         self.size = len(handle.read())
         handle.seek(0)
         self._handle = handle
@@ -66,8 +70,11 @@ class FullSummary: # pylint: disable=too-many-public-methods
             'map': None,
             'lobby_name': None,
             'duration': None,
-            'extraction': None
+            'extraction': None,
+            'truncated': False
         }
+        self._max_time = max_time.total_seconds() * 1000 if max_time is not None else None
+        self._max_operations = max_operations
         self._eapm = collections.Counter()
 
         try:
@@ -98,10 +105,18 @@ class FullSummary: # pylint: disable=too-many-public-methods
         duration = self._header.initial.restore_time
         fast.meta(self._handle)
         self._actions = []
+        count = 0
         while True:
             try:
+                if self._max_operations is not None and count >= self._max_operations:
+                    self._cache['truncated'] = True
+                    break
                 operation, payload = fast.operation(self._handle)
+                count += 1
                 if operation == fast.Operation.SYNC:
+                    if self._max_time is not None and duration - self._header.initial.restore_time + payload[0] > self._max_time:
+                        self._cache['truncated'] = True
+                        break
                     i += 1
                     duration += payload[0]
                     if payload[1] and len(checksums) < CHECKSUMS:
@@ -191,6 +206,10 @@ class FullSummary: # pylint: disable=too-many-public-methods
         """Get game duration."""
         return self._cache['duration']
 
+    def get_truncated(self):
+        """Check if body processing stopped early."""
+        return self._cache['truncated']
+
     def get_restored(self):
         """Check for restored game."""
         return self._header.initial.restore_time > 0, self._header.initial.restore_time
@@ -238,7 +257,7 @@ class FullSummary: # pylint: disable=too-many-public-methods
             self.get_header(),
             self.get_postgame(),
             self.get_teams(),
-            self._cache['resigned'],
+            set() if self.get_truncated() else self._cache['resigned'],
             self._cache['cheaters'],
             self.get_profile_ids(),
             self.get_ratings(),
@@ -327,8 +346,8 @@ class FullSummary: # pylint: disable=too-many-public-methods
 
     def get_map(self):
         """Get map."""
-        tiles = [(tile.terrain_type, tile.elevation) for tile in self._header.map_info.tile]
         if not self._cache['map']:
+            tiles = [(tile.terrain_type, tile.elevation) for tile in self._header.map_info.tile]
             self._cache['map'], self._cache['encoding'], self._cache['language'] = get_map_data(
                 self.get_map_id(),
                 self._header.scenario.messages.instructions,
@@ -0,0 +1,60 @@
+import os
+import threading
+import unittest
+import mgz
+from mgz import batch
+
+
+def unpicklable(match):
+    return threading.Lock()
+
+
+def size_or_crash(handle):
+    if handle.name.endswith('de-63.0.aoe2record'):
+        os._exit(1)
+    return len(handle.read())
+
+
+def socket_timeout(handle):
+    raise TimeoutError("socket timed out")
+
+
+class TestBatch(unittest.TestCase):
+
+    def test_parse_many(self):
+        paths = ['tests/recs/de-61.5.aoe2record', 'tests/recs/missing.mgz']
+        results = {r.path: r for r in mgz.parse_many(paths, workers=2)}
+        self.assertEqual(set(results), set(paths))
+        self.assertTrue(results[paths[0]].ok)
+        self.assertEqual(results[paths[0]].value['map']['name'], 'Arabia')
+        self.assertGreater(results[paths[0]].duration, 0)
+        self.assertFalse(results[paths[1]].ok)
+        self.assertTrue(results[paths[1]].error.startswith('FileNotFoundError'))
+
+    def test_timeout(self):
+        result, = mgz.parse_many(['tests/recs/de-63.0.aoe2record'], workers=1, timeout=0.001)
+        self.assertTrue(result.timed_out)
+        self.assertIsNone(result.value)
+
+    def test_ordered(self):
+        paths = ['tests/recs/de-63.0.aoe2record', 'tests/recs/missing.mgz', 'tests/recs/de-61.5.aoe2record']
+        results = list(mgz.parse_many(paths, workers=3, ordered=True, header_only=True))
+        self.assertEqual([r.path for r in results], paths)
+
+    def test_unpicklable(self):
+        paths = ['tests/recs/de-61.5.aoe2record', 'tests/recs/de-63.0.aoe2record']
+        results = list(mgz.parse_many(paths, workers=2, func=unpicklable, ordered=True))
+        self.assertEqual([r.path for r in results], paths)
+        self.assertTrue(all(not r.ok and 'pickle' in r.error for r in results))
+
+    def test_crash(self):
+        paths = ['tests/recs/de-61.5.aoe2record', 'tests/recs/de-63.0.aoe2record', 'tests/recs/de-62.0.aoe2record', 'tests/recs/de-50.4.aoe2record']
+        results = list(batch.run(size_or_crash, None, paths, workers=2, ordered=True))
+        self.assertEqual([r.path for r in results], paths)
+        self.assertEqual([r.ok for r in results], [True, False, True, True])
+        self.assertTrue(results[1].error.startswith('BrokenProcessPool'))
+
+    def test_target_timeout_error(self):
+        result, = batch.run(socket_timeout, None, ['tests/recs/de-63.0.aoe2record'], workers=1, timeout=60)
+        self.assertFalse(result.timed_out)
+        self.assertTrue(result.error.startswith('TimeoutError'))
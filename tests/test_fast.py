@@ -1,4 +1,10 @@
+import asyncio
+import concurrent.futures
+import io
+import struct
 import unittest
+from mgz import fast
+from mgz.fast import body, live, stream, tail
 from mgz.fast.header import parse
 from mgz.util import Version
 
@@ -88,3 +94,210 @@ class TestFastHD(unittest.TestCase):
 
     def test_map(self):
         self.assertEqual(self.data['scenario']['map_id'], 0)
+
+
+class TestFastObjects(unittest.TestCase):
+
+    def test_object_counts(self):
+        counts = {
+            'de-20.16': [1755, 12, 11],
+            'de-37.0': [2134, 17, 18],
+            'de-50.4': [2449, 17, 17],
+            'de-61.5': [3648, 17, 17],
+            'de-63.0': [14772, 119, 120, 130, 98],
+        }
+        for name, expected in counts.items():
+            with open(f'tests/recs/{name}.aoe2record', 'rb') as handle:
+                data = parse(handle)
+            self.assertEqual([len(p['objects']) for p in data['players']], expected, name)
+
+
+class TestFastBody(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with open('tests/recs/small.mgz', 'rb') as handle:
+            cls.data = handle.read()
+            handle.seek(int.from_bytes(cls.data[:4], 'little') + 4)
+            fast.meta(handle)
+            cls.pos = handle.tell()
+            cls.operations = []
+            while True:
+                try:
+                    cls.operations.append(fast.operation(handle))
+                except EOFError:
+                    break
+
+    def test_meta(self):
+        self.assertEqual(body.meta(self.data, int.from_bytes(self.data[:4], 'little') + 4), self.pos)
+
+    def test_operations(self):
+        self.assertEqual(list(body.operations(self.data, self.pos)), self.operations)
+
+    def test_truncated(self):
+        truncated = self.data[:len(self.data) // 2]
+        operations = list(body.operations(truncated, self.pos))
+        self.assertEqual(operations, self.operations[:len(operations)])
+
+    def test_zero_length_action(self):
+        data = self.data[:self.pos] + struct.pack('<IIB', 1, 0, 0) + bytes(16)
+        self.assertEqual(list(body.operations(data, self.pos)), [])
+        self.assertEqual(body.skip(data, self.pos, 0), self.pos)
+        with self.assertRaises(EOFError):
+            body.boundary(memoryview(data), self.pos)
+
+    def test_index(self):
+        index = body.index(self.data, self.pos)
+        self.assertEqual(len(index), len(self.operations))
+        self.assertEqual(index.count(fast.Operation.SYNC), len([o for o in self.operations if o[0] is fast.Operation.SYNC]))
+        self.assertEqual(index.operation(self.data, len(index) // 2), self.operations[len(index) // 2])
+
+    def test_syncs(self):
+        values = list(range(1, 89))
+        data = struct.pack('<3I', 2, 500, 0) + struct.pack('<88I', *values) + struct.pack('<I', 1234)
+        data += struct.pack('<II', 2, 250) + struct.pack('<4I', 3, 0, 0, 0)
+        syncs = body.syncs(data * 2, 0)
+        self.assertEqual(len(syncs), 2)
+        self.assertEqual(list(syncs.timestamps), [500, 1250])
+        self.assertEqual(list(syncs.current_times), [1234, 1234])
+        self.assertEqual(syncs.grid()[1, 2, 8], values[2 * 11 + 8])
+        self.assertEqual(list(syncs.field('total_res'))[:2], [2, 13])
+        self.assertEqual(len(body.syncs(self.data, self.pos)), 0)
+
+    def test_follower(self):
+        handle = io.BytesIO()
+        follower = live.Follower(handle)
+        operations = []
+        for i in range(0, len(self.data), 5000):
+            handle.seek(0, 2)
+            handle.write(self.data[i:i + 5000])
+            operations += follower.poll()
+        self.assertEqual(operations, self.operations)
+        self.assertEqual(follower.poll(), [])
+
+    def test_lazy(self):
+        for (_, eager), (_, lazy) in zip(self.operations, body.operations(self.data, self.pos, lazy=True)):
+            if not isinstance(lazy, tuple) or not isinstance(lazy[1], fast.LazyAction):
+                continue
+            if eager[0] is fast.Action.ERROR:
+                continue
+            self.assertEqual(lazy[0], eager[0])
+            self.assertEqual(eager[1].get('player_id'), lazy[1].player_id)
+            self.assertEqual(dict(lazy[1]), eager[1])
+
+    def test_filter(self):
+        actions = {fast.Action.RESIGN, fast.Action.MOVE}
+        expected = [o for o in self.operations if o[0] is not fast.Operation.ACTION or o[1][0] in actions]
+        self.assertEqual(list(body.operations(self.data, self.pos, actions=actions)), expected)
+        expected = [o for o in self.operations if o[0] is fast.Operation.CHAT]
+        self.assertEqual(list(body.operations(self.data, self.pos, operation_types={fast.Operation.CHAT})), expected)
+
+
+class TestFastStream(unittest.TestCase):
+
+    def test_push(self):
+        with open('tests/recs/de-61.5.aoe2record', 'rb') as handle:
+            data = handle.read()
+            handle.seek(0)
+            header = parse(handle)
+            expected = list(body.operations(data, body.meta(data, handle.tell())))
+        parser = stream.PushParser()
+        operations = []
+        for i in range(0, len(data), 50000):
+            operations += parser.feed(data[i:i + 50000])
+        operations += parser.close()
+        self.assertEqual(parser.header['players'], header['players'])
+        self.assertEqual(len(operations), len(expected))
+        self.assertEqual(operations[-1], expected[-1])
+
+    def test_async(self):
+        with open('tests/recs/de-61.5.aoe2record', 'rb') as handle:
+            data = handle.read()
+
+        async def collect():
+            reader = asyncio.StreamReader()
+            reader.feed_data(data)
+            reader.feed_eof()
+            parser = stream.PushParser()
+            operations = [o async for o in stream.operations(reader, parser)]
+            return parser, operations
+
+        parser, operations = asyncio.run(collect())
+        self.assertIsNotNone(parser.header)
+        expected = stream.PushParser()
+        self.assertEqual(operations, expected.feed(data) + expected.close())
+
+
+    def test_async_thread_executor(self):
+        with open('tests/recs/de-61.5.aoe2record', 'rb') as handle:
+            data = handle.read()
+
+        async def collect(executor):
+            reader = asyncio.StreamReader()
+            reader.feed_data(data)
+            reader.feed_eof()
+            return [o async for o in stream.operations(reader, executor=executor)]
+
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            operations = asyncio.run(collect(executor))
+        expected = stream.PushParser()
+        self.assertEqual(operations, expected.feed(data) + expected.close())
+        with concurrent.futures.ProcessPoolExecutor(1) as executor:
+            with self.assertRaises(ValueError):
+                asyncio.run(collect(executor))
+
+class TestFastSections(unittest.TestCase):
+
+    def test_sections(self):
+        with open('tests/recs/de-61.5.aoe2record', 'rb') as handle:
+            full = parse(handle)
+            handle.seek(0)
+            data = parse(handle, sections={'metadata'})
+            self.assertEqual(handle.tell(), 315429)
+        self.assertEqual(data['version'], full['version'])
+        self.assertEqual(data['metadata'], full['metadata'])
+        self.assertEqual(data['de']['players'], full['de']['players'])
+        self.assertIsNone(data['players'])
+
+    def test_inflate(self):
+        with open('tests/recs/de-61.5.aoe2record', 'rb') as handle:
+            header = fast.header.inflate(handle)
+            fast.header.parse_version(header, handle)
+            self.assertLess(header.inflated(), 10000)
+            header.seek(0)
+            inflated = header.read()
+            handle.seek(0)
+            self.assertEqual(inflated, fast.header.decompress(handle).getvalue())
+
+
+class TestFastObjects(unittest.TestCase):
+
+    def test_filter(self):
+        with open('tests/recs/de-61.5.aoe2record', 'rb') as handle:
+            full = parse(handle)
+            handle.seek(0)
+            data = parse(handle, objects=fast.header.object_filter(class_ids={80}, players={1, 2}))
+        for player, expected in zip(data['players'], full['players']):
+            objects = [o for o in expected['objects'] if o['class_id'] == 80 and player['number'] in {1, 2}]
+            self.assertEqual(player['objects'], objects)
+        self.assertTrue(data['players'][1]['objects'])
+
+
+class TestFastTail(unittest.TestCase):
+
+    def test_de(self):
+        with open('tests/recs/de-61.5.aoe2record', 'rb') as handle:
+            data = tail.parse(handle)
+        self.assertEqual(data['world_time'], 1674855)
+        self.assertEqual(len(data['leaderboards']), 1)
+        self.assertIsNone(data['postgame'])
+
+    def test_userpatch(self):
+        with open('tests/recs/test.mgz', 'rb') as handle:
+            data = tail.parse(handle)
+        self.assertIsNone(data['world_time'])
+        self.assertTrue(data['postgame'].complete)
+
+    def test_none(self):
+        with open('tests/recs/small.mgz', 'rb') as handle:
+            self.assertEqual(tail.parse(handle), dict(world_time=None, leaderboards=None, postgame=None))
@@ -1,6 +1,13 @@
 import codecs
+import io
+import math
+import sys
 import unittest
-from mgz.model import parse_match
+from datetime import timedelta
+from mgz.fast import Action
+from mgz.fast.header import parse
+from mgz.model import parse_match, Checkpoint, Position
+from mgz.model.columns import ActionColumns
 from mgz.util import Version
 
 class TestModel(unittest.TestCase):
@@ -43,3 +50,160 @@ class TestModel(unittest.TestCase):
         self.assertEqual(self.match.file.encoding, codecs.lookup('latin-1'))
         self.assertEqual(self.match.file.language, 'es')
         self.assertEqual(self.match.file.perspective.name, '[Heresy]LaaaaaN')
+
+
+class TestModelHeaderOnly(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with open('tests/recs/de-61.5.aoe2record', 'rb') as handle:
+            cls.match = parse_match(handle, header_only=True)
+        with open('tests/recs/de-61.5.aoe2record', 'rb') as handle:
+            cls.full = parse_match(handle)
+
+    def test_header(self):
+        self.assertEqual([p.name for p in self.match.players], [p.name for p in self.full.players])
+        self.assertEqual(self.match.map.name, self.full.map.name)
+        self.assertEqual(self.match.file.size, self.full.file.size)
+
+    def test_tiles(self):
+        tiles = self.match.map.tiles
+        self.assertEqual(len(tiles), self.match.map.dimension ** 2)
+        self.assertEqual([t.terrain for t in tiles], list(self.match.map.terrain))
+        self.assertEqual(tiles[-1].position, Position(self.match.map.dimension - 1, self.match.map.dimension - 1))
+        self.assertEqual(tiles[3, 2], tiles[2 * self.match.map.dimension + 3])
+        self.assertEqual(tiles[2:5], [tiles[2], tiles[3], tiles[4]])
+        self.assertEqual(tiles[-2:], [tiles[-2], tiles[-1]])
+        self.assertEqual(tiles.to_dicts()[5], dict(x=5, y=0, terrain_id=tiles[5].terrain, elevation=tiles[5].elevation))
+
+    def test_tiles_equality(self):
+        with open('tests/recs/de-61.5.aoe2record', 'rb') as handle:
+            match = parse_match(handle, header_only=True)
+        self.assertIsNot(match.map.tiles, self.match.map.tiles)
+        self.assertEqual(match.map, self.match.map)
+
+    def test_header_tiles(self):
+        with open('tests/recs/de-61.5.aoe2record', 'rb') as handle:
+            tiles = parse(handle)['map']['tiles']
+        self.assertEqual(len(tiles), len(self.match.map.tiles))
+        self.assertEqual(tiles[7], (self.match.map.terrain[7], self.match.map.elevation[7]))
+
+    @unittest.skipIf(sys.version_info < (3, 10), "slots require Python 3.10")
+    def test_slots(self):
+        self.assertFalse(hasattr(self.full.actions[0], '__dict__'))
+        self.assertFalse(hasattr(self.full.map.tiles[0].position, '__dict__'))
+
+    def test_body(self):
+        self.assertIsNone(self.match.actions)
+        self.assertIsNone(self.match.duration)
+        self.assertIsNone(self.match.file.hash)
+        self.assertIsNone(self.match.players[0].winner)
+
+
+class TestModelTruncated(unittest.TestCase):
+
+    def test_max_time(self):
+        with open('tests/recs/de-61.5.aoe2record', 'rb') as handle:
+            match = parse_match(handle, max_time=timedelta(minutes=5))
+        self.assertTrue(match.truncated)
+        self.assertLessEqual(match.duration, timedelta(minutes=5))
+        self.assertTrue(all(a.timestamp <= timedelta(minutes=5) for a in match.actions))
+        self.assertTrue(all(p.winner is None for p in match.players))
+
+    def test_max_operations(self):
+        with open('tests/recs/de-61.5.aoe2record', 'rb') as handle:
+            match = parse_match(handle, max_operations=10 ** 9)
+        self.assertFalse(match.truncated)
+
+    def test_resume(self):
+        with open('tests/recs/de-61.5.aoe2record', 'rb') as handle:
+            full = parse_match(handle)
+            handle.seek(0)
+            first = parse_match(handle, max_operations=100000, checkpoint=True)
+            handle.seek(0)
+            saved = io.StringIO()
+            first.checkpoint.dump(saved)
+            saved.seek(0)
+            rest = parse_match(handle, resume=Checkpoint.load(saved))
+        self.assertEqual(len(first.actions) + len(rest.actions), len(full.actions))
+        self.assertEqual(rest.actions[-1].timestamp, full.actions[-1].timestamp)
+        self.assertEqual(rest.duration, full.duration)
+        self.assertEqual([p.eapm for p in rest.players], [p.eapm for p in full.players])
+
+    def test_resume_other_file(self):
+        with open('tests/recs/de-61.5.aoe2record', 'rb') as handle:
+            first = parse_match(handle, max_operations=1000, checkpoint=True)
+        with open('tests/recs/de-63.0.aoe2record', 'rb') as handle:
+            with self.assertRaises(ValueError):
+                parse_match(handle, resume=first.checkpoint)
+
+
+class TestModelActionTypes(unittest.TestCase):
+
+    def test_filter_keeps_winners(self):
+        with open('tests/recs/de-63.0.aoe2record', 'rb') as handle:
+            full = parse_match(handle)
+            handle.seek(0)
+            filtered = parse_match(handle, action_types={Action.RESEARCH})
+        self.assertTrue(all(a.type is Action.RESEARCH for a in filtered.actions))
+        self.assertEqual([p.winner for p in filtered.players], [p.winner for p in full.players])
+        # Undecodable actions count toward eAPM when filtered out.
+        self.assertTrue(all(f.eapm >= p.eapm for f, p in zip(filtered.players, full.players)))
+
+    def test_filter_keeps_eapm(self):
+        with open('tests/recs/de-25.01.aoe2record', 'rb') as handle:
+            full = parse_match(handle)
+            handle.seek(0)
+            filtered = parse_match(handle, action_types={Action.RESIGN})
+        self.assertEqual([p.eapm for p in filtered.players], [p.eapm for p in full.players])
+        self.assertEqual([p.winner for p in filtered.players], [p.winner for p in full.players])
+
+
+class TestModelColumnar(unittest.TestCase):
+
+    def assert_columns_match(self, path):
+        with open(path, 'rb') as handle:
+            full = parse_match(handle, checkpoint=True)
+            handle.seek(0)
+            columnar = parse_match(handle, columnar=True, checkpoint=True)
+        columns = columnar.actions
+        self.assertEqual(len(columns), len(full.actions))
+        self.assertEqual(list(columns.timestamps), [a.timestamp // timedelta(milliseconds=1) for a in full.actions])
+        self.assertEqual(list(columns.types), [a.type.value for a in full.actions])
+        for i, action in enumerate(full.actions):
+            ids = [o & 0xFFFFFFFF for o in action.payload.get('object_ids', [])]
+            self.assertEqual(list(columns.get_object_ids(i)), ids)
+        self.assertEqual([p.eapm for p in columnar.players], [p.eapm for p in full.players])
+        self.assertEqual(columnar.checkpoint.resigned, full.checkpoint.resigned)
+        self.assertEqual([p.winner for p in columnar.players], [p.winner for p in full.players])
+
+    def test_de(self):
+        self.assert_columns_match('tests/recs/de-61.5.aoe2record')
+
+    def test_userpatch(self):
+        self.assert_columns_match('tests/recs/small.mgz')
+
+
+class TestActionColumns(unittest.TestCase):
+
+    def test_append(self):
+        columns = ActionColumns()
+        columns.append(1000, Action.MOVE, dict(player_id=1, x=10.5, y=20.5, object_ids=[5, 6]))
+        columns.append(2000, Action.RESIGN, dict(player_id=2))
+        self.assertEqual(len(columns), 2)
+        self.assertEqual(list(columns.timestamps), [1000, 2000])
+        self.assertEqual(list(columns.types), [Action.MOVE.value, Action.RESIGN.value])
+        self.assertEqual(list(columns.players), [1, 2])
+        self.assertEqual(columns.x[0], 10.5)
+        self.assertTrue(math.isnan(columns.y[1]))
+        self.assertEqual(list(columns.targets), [-1, -1])
+        self.assertEqual(list(columns.get_object_ids(0)), [5, 6])
+        self.assertEqual(list(columns.get_object_ids(1)), [])
+
+    def test_append_out_of_range_object_ids(self):
+        columns = ActionColumns()
+        columns.append(1000, Action.MOVE, dict(player_id=1, object_ids=[1, 2, -3]))
+        columns.append(2000, Action.MOVE, dict(player_id=1, object_ids=[4]))
+        self.assertEqual(list(columns.object_ids), [1, 2, 4294967293, 4])
+        self.assertEqual(list(columns.get_object_ids(0)), [1, 2, 4294967293])
+        self.assertEqual(list(columns.get_object_ids(1)), [4])
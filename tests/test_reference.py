@@ -0,0 +1,41 @@
+import json
+import unittest
+from mgz import reference
+from mgz.common.map import lookup_name
+from mgz.util import Version
+
+
+class TestReference(unittest.TestCase):
+
+    def test_cache(self):
+        reference.load()
+        _, indexed = reference.get_dataset(Version.DE, [], indexed=True)
+        self.assertIs(reference.get_dataset(Version.DE, [], indexed=True)[1], indexed)
+        self.assertIs(reference.get_consts(indexed=True), reference.get_consts(indexed=True))
+        with self.assertRaises(TypeError):
+            indexed['maps'][9] = 'Changed'
+        reference.clear_cache()
+        self.assertIsNot(reference.get_dataset(Version.DE, [], indexed=True)[1], indexed)
+        self.assertEqual(reference.get_dataset(Version.DE, [], indexed=True)[1]['maps'][9], indexed['maps'][9])
+
+    def test_copy(self):
+        dataset_id, dataset = reference.get_dataset(Version.DE, [])
+        self.assertEqual(dataset_id, 100)
+        self.assertIsInstance(dataset, dict)
+        self.assertIsInstance(reference.get_consts(), dict)
+        json.dumps(reference.get_consts())
+        dataset['maps']['9'] = 'Changed'
+        self.assertNotEqual(reference.get_dataset(Version.DE, [])[1]['maps']['9'], 'Changed')
+
+    def test_indexed(self):
+        _, dataset = reference.get_dataset(Version.DE, [])
+        _, indexed = reference.get_dataset(Version.DE, [], indexed=True)
+        self.assertEqual(indexed['maps'][9], dataset['maps']['9'])
+        self.assertEqual(indexed['dataset'], dataset['dataset'])
+        self.assertEqual(reference.get_consts(indexed=True)['speeds'][150], reference.get_consts()['speeds']['150'])
+
+    def test_lookup_name(self):
+        _, dataset = reference.get_dataset(Version.DE, [])
+        _, indexed = reference.get_dataset(Version.DE, [], indexed=True)
+        self.assertEqual(lookup_name(9, 'x', Version.DE, indexed), (dataset['maps']['9'], False))
+        self.assertEqual(lookup_name(9, 'x', Version.DE, dataset), (dataset['maps']['9'], False))